@@ -1,5 +1,5 @@
 """PyVNA public API."""
-from .models import SweepConfig, VNAData
+from .models import SweepBlock, SweepConfig, VNAData
 from .vna import VNA
 from .driver import VNAPool, driver_factory
 from .calibration import (
@@ -13,6 +13,7 @@ from .calibration import (
 
 __all__ = [
     "VNA",
+    "SweepBlock",
     "SweepConfig",
     "VNAData",
     "VNAPool",
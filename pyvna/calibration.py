@@ -4,12 +4,16 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Sequence
 
-import math
+import numpy as np
+import numpy.typing as npt
 
 from .models import SweepConfig, VNAData
 
+FREQUENCY_TOLERANCE_HZ = 1e-3
+_MAX_REPORTED_POINTS = 10
+
 
 class CalibrationMethod(str, Enum):
     SOL = "SOL"
@@ -39,16 +43,69 @@ CalibrationPrompt = Callable[[CalibrationStandard], None]
 
 @dataclass
 class CalibrationMeasurement:
-    frequencies: List[float]
-    s11: List[complex]
-    s21: List[complex]
+    """Raw reading of one calibration standard.
+
+    ``s11`` and ``s21`` hold either a single sweep of shape ``(points,)`` or a
+    stack of repeated sweeps of shape ``(sweeps, points)``.  Stacks are
+    averaged by :func:`compute_error_terms`.  Sequences passed to the
+    constructor are converted to ``float64``/``complex128`` arrays.
+    """
+
+    frequencies: np.ndarray
+    s11: np.ndarray
+    s21: np.ndarray
+
+    def __post_init__(self) -> None:
+        self.frequencies = _clone_floats(self.frequencies)
+        self.s11 = np.asarray(self.s11, dtype=np.complex128)
+        self.s21 = np.asarray(self.s21, dtype=np.complex128)
+        for name in ("s11", "s21"):
+            values = getattr(self, name)
+            if values.ndim not in (1, 2) or values.shape[-1] != len(self.frequencies):
+                raise ValueError(f"calibration {name} shape {values.shape} does not match frequency grid")
+
+    @classmethod
+    def from_sweeps(cls, sweeps: Sequence[VNAData]) -> "CalibrationMeasurement":
+        """Stack repeated sweeps of the same standard into one measurement."""
+
+        if not sweeps:
+            raise ValueError("at least one sweep is required")
+        first = sweeps[0]
+        for sweep in sweeps[1:]:
+            if not _frequencies_match(first.frequencies, sweep.frequencies):
+                raise ValueError("repeated sweeps use mismatched frequency grids")
+        return cls(
+            frequencies=first.frequencies,
+            s11=np.stack([sweep.s11 for sweep in sweeps]),
+            s21=np.stack([sweep.s21 for sweep in sweeps]),
+        )
+
+    @property
+    def sweeps(self) -> int:
+        return 1 if self.s11.ndim == 1 else self.s11.shape[0]
+
+    def mean_s11(self) -> np.ndarray:
+        """Return S11 averaged over all repeated sweeps."""
+
+        return self.s11 if self.s11.ndim == 1 else self.s11.mean(axis=0)
+
+
+def _empty_complex() -> np.ndarray:
+    return np.empty(0, dtype=np.complex128)
 
 
 @dataclass
 class CalibrationErrorTerms:
-    directivity: List[complex] = field(default_factory=list)
-    source_match: List[complex] = field(default_factory=list)
-    reflection_tracking: List[complex] = field(default_factory=list)
+    """Per-point SOL error terms, stored as ``complex128`` arrays."""
+
+    directivity: np.ndarray = field(default_factory=_empty_complex)
+    source_match: np.ndarray = field(default_factory=_empty_complex)
+    reflection_tracking: np.ndarray = field(default_factory=_empty_complex)
+
+    def __post_init__(self) -> None:
+        self.directivity = _as_complex_array(self.directivity)
+        self.source_match = _as_complex_array(self.source_match)
+        self.reflection_tracking = _as_complex_array(self.reflection_tracking)
 
 
 @dataclass
@@ -57,12 +114,15 @@ class CalibrationProfile:
     method: CalibrationMethod
     created_at: datetime
     sweep: SweepConfig
-    frequencies: List[float]
+    frequencies: np.ndarray
     standards: Dict[CalibrationStandard, CalibrationMeasurement]
     error_terms: CalibrationErrorTerms
 
+    def __post_init__(self) -> None:
+        self.frequencies = _clone_floats(self.frequencies)
+
     def validate(self) -> None:
-        if not self.frequencies:
+        if len(self.frequencies) == 0:
             raise ValueError("calibration profile does not contain frequency data")
         ft_len = len(self.frequencies)
         if (
@@ -77,45 +137,77 @@ class CalibrationProfile:
                     raise ValueError(f"missing calibration measurement for {required.value}")
 
     def apply(self, data: VNAData) -> VNAData:
+        """Return a copy of ``data`` with the SOL correction applied to S11.
+
+        The correction is evaluated over whole arrays.  NumPy and CPython use
+        different complex division algorithms, so results agree with a
+        per-point scalar evaluation to within 1e-12 relative error rather than
+        bit-for-bit.
+        """
         if len(data.frequencies) != len(self.frequencies):
             raise ValueError("data frequency grid does not match calibration")
-        for idx, freq in enumerate(data.frequencies):
-            if not math.isclose(freq, self.frequencies[idx], rel_tol=0, abs_tol=1e-3):
-                raise ValueError("data frequencies do not match calibration")
-        calibrated = VNAData(
+        return self.apply_range(data, 0)
+
+    def apply_range(self, data: VNAData, offset: int) -> VNAData:
+        """Correct a block of consecutive points starting at grid index ``offset``."""
+
+        end = offset + len(data.frequencies)
+        if offset < 0 or end > len(self.frequencies):
+            raise ValueError("data frequency grid does not match calibration")
+        if not _frequencies_match(data.frequencies, self.frequencies[offset:end]):
+            raise ValueError("data frequencies do not match calibration")
+
+        e00 = _as_complex_array(self.error_terms.directivity)[offset:end]
+        e11 = _as_complex_array(self.error_terms.source_match)[offset:end]
+        tracking = _as_complex_array(self.error_terms.reflection_tracking)[offset:end]
+        numerator = data.s11 - e00
+        denominator = e11 + tracking * numerator
+        _check_denominator(denominator, data.frequencies, "applying calibration")
+
+        return VNAData(
             frequencies=data.frequencies.copy(),
-            s11=[0j] * len(data.s11),
+            s11=numerator / denominator,
             s21=data.s21.copy(),
         )
-        for idx, measurement in enumerate(data.s11):
-            e00 = self.error_terms.directivity[idx]
-            e11 = self.error_terms.source_match[idx]
-            tracking = self.error_terms.reflection_tracking[idx]
-            numerator = measurement - e00
-            denominator = e11 + tracking * (measurement - e00)
-            if denominator == 0:
-                raise ZeroDivisionError(
-                    f"division by zero while applying calibration at {data.frequencies[idx]:.3f} Hz"
-                )
-            calibrated.s11[idx] = numerator / denominator
-        return calibrated
 
 
-def _clone_floats(values: List[float]) -> List[float]:
-    return list(values) if values is not None else []
+def _clone_floats(values: npt.ArrayLike) -> np.ndarray:
+    return np.array(values if values is not None else [], dtype=np.float64)
+
 
+def _clone_complex(values: npt.ArrayLike) -> np.ndarray:
+    return np.array(values if values is not None else [], dtype=np.complex128)
 
-def _clone_complex(values: List[complex]) -> List[complex]:
-    return list(values) if values is not None else []
 
+def _as_complex_array(values: npt.ArrayLike) -> np.ndarray:
+    return np.asarray(values, dtype=np.complex128)
 
-def _frequencies_match(a: List[float], b: List[float]) -> bool:
+
+def _frequencies_match(a: npt.ArrayLike, b: npt.ArrayLike) -> bool:
     if len(a) != len(b):
         return False
-    return all(math.isclose(x, y, rel_tol=0, abs_tol=1e-3) for x, y in zip(a, b))
+    diff = np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)
+    return bool(np.all(np.abs(diff) <= FREQUENCY_TOLERANCE_HZ))
+
+
+def _check_denominator(denominator: np.ndarray, frequencies: np.ndarray, action: str) -> None:
+    """Raise :class:`ZeroDivisionError` listing every point with a zero denominator."""
+
+    zero = np.flatnonzero(denominator == 0)
+    if zero.size == 0:
+        return
+    shown = ", ".join(f"{freq:.3f} Hz" for freq in np.asarray(frequencies)[zero[:_MAX_REPORTED_POINTS]])
+    if zero.size > _MAX_REPORTED_POINTS:
+        shown += f" and {zero.size - _MAX_REPORTED_POINTS} more"
+    raise ZeroDivisionError(f"division by zero while {action} at {shown}")
 
 
 def compute_error_terms(profile: CalibrationProfile) -> None:
+    """Derive SOL error terms from the open, short and load measurements.
+
+    Measurements holding several repeated sweeps are averaged point-wise
+    before the error model is solved.
+    """
     try:
         open_meas = profile.standards[CalibrationStandard.OPEN]
         short_meas = profile.standards[CalibrationStandard.SHORT]
@@ -123,7 +215,7 @@ def compute_error_terms(profile: CalibrationProfile) -> None:
     except KeyError as exc:
         raise ValueError("SOL calibration requires open, short and load measurements") from exc
 
-    if not load_meas.s11:
+    if load_meas.s11.size == 0:
         raise ValueError("calibration measurements are empty")
     if not (
         _frequencies_match(load_meas.frequencies, open_meas.frequencies)
@@ -131,31 +223,19 @@ def compute_error_terms(profile: CalibrationProfile) -> None:
     ):
         raise ValueError("calibration standards use mismatched frequency grids")
 
-    count = len(load_meas.s11)
-    directivity: List[complex] = [0j] * count
-    source_match: List[complex] = [0j] * count
-    tracking: List[complex] = [0j] * count
-
-    for idx in range(count):
-        e00 = load_meas.s11[idx]
-        lo = open_meas.s11[idx] - e00
-        ls = short_meas.s11[idx] - e00
-        denom = lo - ls
-        if denom == 0:
-            raise ZeroDivisionError(
-                f"division by zero when computing error terms at {load_meas.frequencies[idx]:.3f} Hz"
-            )
-        e10e32 = (lo + ls) / denom
-        e11 = -ls * (1 + e10e32)
-        directivity[idx] = e00
-        source_match[idx] = e11
-        tracking[idx] = e10e32
+    e00 = load_meas.mean_s11()
+    lo = open_meas.mean_s11() - e00
+    ls = short_meas.mean_s11() - e00
+    denom = lo - ls
+    _check_denominator(denom, load_meas.frequencies, "computing error terms")
+    e10e32 = (lo + ls) / denom
+    e11 = -ls * (1 + e10e32)
 
     profile.frequencies = _clone_floats(load_meas.frequencies)
     profile.error_terms = CalibrationErrorTerms(
-        directivity=directivity,
-        source_match=source_match,
-        reflection_tracking=tracking,
+        directivity=e00.copy(),
+        source_match=e11,
+        reflection_tracking=e10e32,
     )
 
 
@@ -1,11 +1,15 @@
 """Driver abstractions and VNA pooling logic."""
 from __future__ import annotations
 
-from threading import RLock
-from typing import Dict, Protocol
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from enum import Enum
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol
 
-from .util.serial_port import SerialPortInterface, open_port
-from .models import SweepConfig, VNAData
+from .util.serial_port import SerialPortInterface, open_port, usb_ids
+from .models import SweepBlock, SweepConfig, VNAData
 from .vna import VNA
 from .driver_v1 import V1Driver
 from .driver_v2 import V2Driver
@@ -20,55 +24,515 @@ class Driver(Protocol):
 
     def scan(self) -> VNAData: ...
 
+    def scan_blocks(self) -> Iterator[SweepBlock]: ...
+
     def close(self) -> None: ...
 
 
-def driver_factory(port: SerialPortInterface) -> Driver:
-    """Try to detect the device and instantiate the right driver."""
+# Known USB IDs per device family, used to skip probing the wrong protocol.
+V1_USB_IDS = frozenset({(0x0483, 0x5740)})
+V2_USB_IDS = frozenset({(0x04B4, 0x0008)})
+PROBE_TIMEOUT = 0.15
+
+_DRIVERS: Dict[str, Callable[[SerialPortInterface], Any]] = {"v1": V1Driver, "v2": V2Driver}
+
+
+class DetectionCache:
+    """Remembers which driver family answered on each port path."""
+
+    def __init__(self) -> None:
+        self._families: Dict[str, str] = {}
+        self._lock = Lock()
+
+    def get(self, port_path: str) -> Optional[str]:
+        with self._lock:
+            return self._families.get(port_path)
+
+    def remember(self, port_path: str, family: str) -> None:
+        with self._lock:
+            self._families[port_path] = family
+
+    def invalidate(self, port_path: Optional[str] = None) -> None:
+        """Forget one port, or every port when ``port_path`` is ``None``."""
+
+        with self._lock:
+            if port_path is None:
+                self._families.clear()
+            else:
+                self._families.pop(port_path, None)
+
+
+detection_cache = DetectionCache()
+
+
+def _probe_order(port_path: Optional[str], cache: DetectionCache) -> list[str]:
+    preferred: Optional[str] = None
+    if port_path is not None:
+        preferred = cache.get(port_path)
+        if preferred is None:
+            ids = usb_ids(port_path)
+            if ids in V1_USB_IDS:
+                preferred = "v1"
+            elif ids in V2_USB_IDS:
+                preferred = "v2"
+    # Without a hint V1 goes first: its text probe is ignored by the V2
+    # binary parser, while the V2 probe would leave junk in a V1 shell.
+    order = ["v1", "v2"]
+    if preferred is not None:
+        order.remove(preferred)
+        order.insert(0, preferred)
+    return order
+
+
+def driver_factory(
+    port: SerialPortInterface,
+    port_path: Optional[str] = None,
+    cache: DetectionCache = detection_cache,
+) -> Driver:
+    """Try to detect the device and instantiate the right driver.
+
+    When ``port_path`` is given, a cached result or the USB IDs from sysfs
+    decide which protocol is probed first, and the result is cached.
+    """
+
+    last_error: Optional[Exception] = None
+    for family in _probe_order(port_path, cache):
+        driver = _DRIVERS[family](port)
+        try:
+            driver.identify(timeout=PROBE_TIMEOUT)
+        except Exception as exc:
+            last_error = exc
+            continue
+        if port_path is not None:
+            cache.remember(port_path, family)
+        return driver
+    if port_path is not None:
+        cache.invalidate(port_path)
+    raise RuntimeError("failed to identify VNA device") from last_error
+
+
+@dataclass
+class DeviceScanResult:
+    """Outcome of scanning one device as part of a pool batch."""
+
+    port: str
+    data: Optional[VNAData] = None
+    error: Optional[BaseException] = None
+    duration: float = 0.0
 
-    v1_driver = V1Driver(port)
-    try:
-        v1_driver.identify()
-        return v1_driver
-    except Exception:
-        pass
+    @property
+    def ok(self) -> bool:
+        return self.error is None
 
-    v2_driver = V2Driver(port)
-    try:
-        v2_driver.identify()
-        return v2_driver
-    except Exception as exc:
-        raise RuntimeError("failed to identify VNA device") from exc
+
+@dataclass
+class PoolScanResult:
+    """Per-device results of :meth:`VNAPool.scan_many`, in the order requested."""
+
+    results: List[DeviceScanResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.results)
+
+    @property
+    def failures(self) -> List[DeviceScanResult]:
+        return [result for result in self.results if not result.ok]
+
+    def __getitem__(self, port: str) -> DeviceScanResult:
+        for result in self.results:
+            if result.port == port:
+                return result
+        raise KeyError(port)
+
+
+class DeviceState(str, Enum):
+    HEALTHY = "healthy"
+    FAILED = "failed"
+
+
+@dataclass
+class DeviceHealth:
+    """Supervisor view of one pool device; times come from :func:`time.monotonic`."""
+
+    state: DeviceState = DeviceState.HEALTHY
+    last_used: float = 0.0
+    last_probe: float = 0.0
+    failures: int = 0
+    last_error: Optional[str] = None
+    next_retry: float = 0.0
+
+
+class DeviceUnavailableError(RuntimeError):
+    """Raised without touching the port when a device is known to be down."""
+
+
+# Drivers prefix the messages of protocol errors with their version.
+_PROTOCOL_ERROR_PREFIXES = ("v1:", "v2:")
+
+
+def is_device_failure(exc: BaseException) -> bool:
+    """Whether a scan error means the device itself misbehaved.
+
+    I/O errors, timeouts, driver runtime errors and garbled replies count;
+    rejected sweeps and calibration arithmetic errors do not.
+    """
+    if isinstance(exc, (OSError, RuntimeError)):
+        return True
+    return isinstance(exc, ValueError) and str(exc).startswith(_PROTOCOL_ERROR_PREFIXES)
+
+
+# How often scan_many re-checks per-device deadlines while scans are queued.
+SCAN_POLL_INTERVAL = 0.05
+
+
+def _wait_per_device(
+    futures: List[Optional[Future[DeviceScanResult]]], begun: List[Optional[float]], timeout: float
+) -> None:
+    """Wait until every scan finished or ran ``timeout`` seconds past its start."""
+
+    pending = {idx for idx, future in enumerate(futures) if future is not None}
+    while pending:
+        now = time.perf_counter()
+        wait_for = SCAN_POLL_INTERVAL
+        for idx in list(pending):
+            future = futures[idx]
+            assert future is not None
+            started = begun[idx]
+            if future.done():
+                pending.discard(idx)
+            elif started is not None:
+                remaining = started + timeout - now
+                if remaining <= 0:
+                    pending.discard(idx)
+                else:
+                    wait_for = min(wait_for, remaining)
+        if pending:
+            wait([futures[idx] for idx in pending], timeout=wait_for, return_when=FIRST_COMPLETED)  # type: ignore[misc]
 
 
 class VNAPool:
-    """Manage a pool of open VNAs for concurrent access."""
+    """Manage a pool of open VNAs for concurrent access.
 
-    def __init__(self) -> None:
+    Opening a device can take a while, so it happens outside the pool lock:
+    the first caller for a port performs the open and concurrent callers for
+    the same port wait on its future.  Devices that are already open are
+    returned without taking any lock.
+
+    Devices that fail to open, fail a liveness probe or fail a scan are marked
+    failed; :meth:`get` then raises :class:`DeviceUnavailableError` straight
+    away until the retry backoff has elapsed.  The optional supervisor
+    (:meth:`start_supervisor`) probes devices, evicts devices unused for
+    ``idle_ttl`` seconds and reconnects failed ones.
+    """
+
+    def __init__(
+        self,
+        max_scan_workers: int = 16,
+        idle_ttl: Optional[float] = None,
+        probe_interval: float = 5.0,
+        retry_backoff: float = 1.0,
+        max_retry_backoff: float = 30.0,
+    ) -> None:
         self._devices: Dict[str, VNA] = {}
-        self._lock = RLock()
+        self._health: Dict[str, DeviceHealth] = {}
+        self._pending: Dict[str, Future[VNA]] = {}
+        self._lock = Lock()
+        self._max_scan_workers = max_scan_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._idle_ttl = idle_ttl
+        self._probe_interval = probe_interval
+        self._retry_backoff = retry_backoff
+        self._max_retry_backoff = max_retry_backoff
+        self._supervisor: Optional[Thread] = None
+        self._supervisor_stop = Event()
+        # Timed-out scan_many scans that are still running, by port.
+        self._stalled_scans: Dict[str, Future[DeviceScanResult]] = {}
+        self._close_listeners: List[Callable[[str], None]] = []
 
     def get(self, port_path: str) -> VNA:
+        vna = self._devices.get(port_path)
+        health = self._health.get(port_path)
+        if vna is not None:
+            if health is not None:
+                health.last_used = time.monotonic()
+            return vna
+        if health is not None and health.state is DeviceState.FAILED:
+            wait_for = health.next_retry - time.monotonic()
+            if wait_for > 0:
+                raise DeviceUnavailableError(
+                    f"device {port_path} is unavailable ({health.last_error}); retrying in {wait_for:.1f} s"
+                )
+        return self._open_shared(port_path)
+
+    def peek(self, port_path: str) -> Optional[VNA]:
+        """Return the open device for ``port_path`` without opening it."""
+
+        return self._devices.get(port_path)
+
+    def on_close(self, listener: Callable[[str], None]) -> None:
+        """Call ``listener(port_path)`` whenever a device fails to open, fails or is evicted."""
+
+        self._close_listeners.append(listener)
+
+    def device_states(self) -> Dict[str, DeviceHealth]:
+        """Return a snapshot of the health of every known device."""
+
+        with self._lock:
+            return {port: replace(health) for port, health in self._health.items()}
+
+    def report_failure(self, port_path: str, error: BaseException) -> None:
+        """Mark a device as failed and close it so the next request fails fast."""
+
+        self._mark_failed(port_path, error, self._devices.get(port_path))
+
+    def supervise_once(self, now: Optional[float] = None) -> None:
+        """Run one supervisor pass: evict idle devices, probe the rest, reconnect failed ones."""
+
+        if now is None:
+            now = time.monotonic()
         with self._lock:
-            if port_path in self._devices:
-                return self._devices[port_path]
+            devices = list(self._devices.items())
+            health = dict(self._health)
 
-            port = open_port(port_path, baudrate=115200)
+        for port_path, vna in devices:
+            state = health.get(port_path)
+            if state is None:
+                continue
+            if self._idle_ttl is not None and now - state.last_used >= self._idle_ttl:
+                self._evict(port_path, vna)
+                continue
+            if now - state.last_probe < self._probe_interval:
+                continue
             try:
-                driver = driver_factory(port)
-            except Exception:
-                port.close()
-                raise
+                vna.probe()
+            except Exception as exc:
+                self._mark_failed(port_path, exc, vna)
+                continue
+            state.last_probe = now
+
+        for port_path, state in health.items():
+            if state.state is not DeviceState.FAILED:
+                continue
+            if self._idle_ttl is not None and now - state.last_used >= self._idle_ttl:
+                with self._lock:
+                    if self._health.get(port_path) is state:
+                        del self._health[port_path]
+            elif now >= state.next_retry:
+                try:
+                    self._open_shared(port_path)
+                except Exception:
+                    pass
+
+    def start_supervisor(self, interval: Optional[float] = None) -> None:
+        """Call :meth:`supervise_once` every ``interval`` seconds from a background thread."""
+
+        if self._supervisor is not None:
+            return
+        period = self._probe_interval if interval is None else interval
+        self._supervisor_stop.clear()
+
+        def run() -> None:
+            while not self._supervisor_stop.wait(period):
+                try:
+                    self.supervise_once()
+                except Exception:
+                    pass
 
-            vna = VNA(driver)
+        self._supervisor = Thread(target=run, name="pyvna-pool-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def stop_supervisor(self) -> None:
+        thread = self._supervisor
+        if thread is None:
+            return
+        self._supervisor_stop.set()
+        thread.join()
+        self._supervisor = None
+
+    def _open_shared(self, port_path: str) -> VNA:
+        with self._lock:
+            vna = self._devices.get(port_path)
+            if vna is not None:
+                return vna
+            future = self._pending.get(port_path)
+            owner = future is None
+            if future is None:
+                future = Future()
+                self._pending[port_path] = future
+        if not owner:
+            return future.result()
+
+        try:
+            vna = self._open_device(port_path)
+        except BaseException as exc:
+            with self._lock:
+                self._pending.pop(port_path, None)
+            if isinstance(exc, Exception):
+                self._mark_failed(port_path, exc)
+            future.set_exception(exc)
+            raise
+        now = time.monotonic()
+        with self._lock:
+            self._pending.pop(port_path, None)
             self._devices[port_path] = vna
-            return vna
+            self._health[port_path] = DeviceHealth(last_used=now, last_probe=now)
+        future.set_result(vna)
+        return vna
 
-    def close_all(self) -> None:
+    def _mark_failed(self, port_path: str, error: BaseException, vna: Optional[VNA] = None) -> None:
+        now = time.monotonic()
         with self._lock:
-            for vna in self._devices.values():
+            if vna is not None and self._devices.get(port_path) is vna:
+                del self._devices[port_path]
+            health = self._health.setdefault(port_path, DeviceHealth(last_used=now))
+            health.state = DeviceState.FAILED
+            health.failures += 1
+            health.last_error = str(error)
+            backoff = self._retry_backoff * 2 ** (health.failures - 1)
+            health.next_retry = now + min(self._max_retry_backoff, backoff)
+        detection_cache.invalidate(port_path)
+        if vna is not None:
+            try:
                 vna.close()
+            except Exception:
+                pass
+        self._notify_closed(port_path)
+
+    def _evict(self, port_path: str, vna: VNA) -> None:
+        with self._lock:
+            if self._devices.get(port_path) is vna:
+                del self._devices[port_path]
+            self._health.pop(port_path, None)
+        vna.close()
+        self._notify_closed(port_path)
+
+    def _notify_closed(self, port_path: str) -> None:
+        for listener in list(self._close_listeners):
+            try:
+                listener(port_path)
+            except Exception:
+                pass
+
+    def scan_many(
+        self,
+        ports: Iterable[str],
+        sweep: Optional[SweepConfig] = None,
+        timeout: Optional[float] = None,
+    ) -> PoolScanResult:
+        """Scan several devices in parallel on a bounded worker pool.
+
+        Each device applies its own calibration.  Results keep the order of
+        ``ports``; failures and devices that did not finish within ``timeout``
+        seconds of their worker starting are reported in their entry instead
+        of raising.  A scan that timed out keeps running on its worker; until
+        it finishes, later batches report that device as timed out right away
+        instead of queueing behind it.
+        """
+        ports = list(ports)
+        started = time.perf_counter()
+        executor = self._scan_executor()
+        begun: List[Optional[float]] = [None] * len(ports)
+        futures: List[Optional[Future[DeviceScanResult]]] = []
+        with self._lock:
+            stalled = {port for port, future in self._stalled_scans.items() if not future.done()}
+        for idx, port in enumerate(ports):
+            if port in stalled:
+                futures.append(None)
+                continue
+            futures.append(executor.submit(self._timed_scan, begun, idx, port, sweep))
+        if timeout is None:
+            wait([future for future in futures if future is not None])
+        else:
+            _wait_per_device(futures, begun, timeout)
+
+        results: List[DeviceScanResult] = []
+        for idx, (port, future) in enumerate(zip(ports, futures)):
+            if future is not None and future.done():
+                results.append(future.result())
+                continue
+            if future is None:
+                error = TimeoutError(f"previous scan of {port} is still running")
+                duration = 0.0
+            else:
+                error = TimeoutError(f"scan of {port} did not finish within {timeout} s")
+                duration = time.perf_counter() - (begun[idx] or started)
+                self._track_stalled(port, future)
+            results.append(DeviceScanResult(port=port, error=error, duration=duration))
+        return PoolScanResult(results=results, elapsed=time.perf_counter() - started)
+
+    def _timed_scan(
+        self, begun: List[Optional[float]], idx: int, port: str, sweep: Optional[SweepConfig]
+    ) -> DeviceScanResult:
+        begun[idx] = time.perf_counter()
+        return self._scan_one(port, sweep)
+
+    def _track_stalled(self, port: str, future: Future[DeviceScanResult]) -> None:
+        with self._lock:
+            self._stalled_scans[port] = future
+
+        def forget(_: Future[DeviceScanResult]) -> None:
+            with self._lock:
+                if self._stalled_scans.get(port) is future:
+                    del self._stalled_scans[port]
+
+        future.add_done_callback(forget)
+
+    def _scan_one(self, port: str, sweep: Optional[SweepConfig]) -> DeviceScanResult:
+        started = time.perf_counter()
+        try:
+            vna = self.get(port)
+        except Exception as exc:
+            return DeviceScanResult(port=port, error=exc, duration=time.perf_counter() - started)
+        try:
+            data = vna.get_data(sweep)
+        except Exception as exc:
+            if is_device_failure(exc):
+                self.report_failure(port, exc)
+            return DeviceScanResult(port=port, error=exc, duration=time.perf_counter() - started)
+        return DeviceScanResult(port=port, data=data, duration=time.perf_counter() - started)
+
+    def _scan_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_scan_workers, thread_name_prefix="pyvna-scan"
+                )
+            return self._executor
+
+    def _open_device(self, port_path: str) -> VNA:
+        port = open_port(port_path, baudrate=115200)
+        try:
+            driver = driver_factory(port, port_path)
+        except Exception:
+            port.close()
+            raise
+        return VNA(driver)
+
+    def close_all(self) -> None:
+        self.stop_supervisor()
+        with self._lock:
+            devices = list(self._devices.values())
             self._devices.clear()
+            self._health.clear()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for vna in devices:
+            vna.close()
 
 
-__all__ = ["Driver", "driver_factory", "VNAPool"]
+__all__ = [
+    "Driver",
+    "DetectionCache",
+    "DeviceHealth",
+    "DeviceScanResult",
+    "DeviceState",
+    "DeviceUnavailableError",
+    "PoolScanResult",
+    "detection_cache",
+    "driver_factory",
+    "is_device_failure",
+    "VNAPool",
+]
@@ -1,76 +1,329 @@
 """Driver implementation for the NanoVNA V1 text protocol."""
 from __future__ import annotations
 
+import io
+import re
+import struct
 import time
 from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+import numpy as np
 
 from .util.serial_port import SerialPortInterface
-from .models import SweepConfig, VNAData
+from .models import SweepBlock, SweepConfig, VNAData, block_view, split_sweep
+
+PROMPT = b"ch>"
+PROMPT_TERMINATOR = PROMPT + b" "
+
+# ``scan`` outmask bits selecting the columns printed per point.
+SCAN_OUT_FREQUENCY = 0x1
+SCAN_OUT_S11 = 0x2
+SCAN_OUT_S21 = 0x4
+SCAN_OUTMASK = SCAN_OUT_FREQUENCY | SCAN_OUT_S11 | SCAN_OUT_S21
+
+# Setting this outmask bit makes ``scan`` reply with a ``<HH`` (mask, points)
+# header followed by one packed little-endian record per point.
+SCAN_OUT_BINARY = 0x80
+SCAN_BIN_HEADER = struct.Struct("<HH")
+SCAN_BIN_RECORD_DTYPE = np.dtype(
+    [("frequency", "<u4"), ("s11_re", "<f4"), ("s11_im", "<f4"), ("s21_re", "<f4"), ("s21_im", "<f4")]
+)
+
+# Blank lines, prompts and echoed commands; everything else is numeric data.
+_NOISE_LINE = re.compile(rb"^[ \t]*(?:ch>[ \t]*)?(?:[A-Za-z][^\n]*)?(?:\n|\Z)", re.MULTILINE)
+
+
+def _strip_noise(response: bytes | bytearray) -> bytes:
+    return _NOISE_LINE.sub(b"", bytes(response).replace(b"\r", b""))
+
+
+def _count_lines(block: bytes) -> int:
+    if not block:
+        return 0
+    return block.count(b"\n") + (0 if block.endswith(b"\n") else 1)
 
 
 @dataclass
 class V1Driver:
     port: SerialPortInterface
     config: SweepConfig = field(default_factory=lambda: SweepConfig(0.0, 0.0, 0))
+    response_timeout: float = 2.0
+    bulk_read: bool = True
+    use_scan_command: bool = True
+    max_segment_points: int = 101
+    binary_scan: bool = False
+    _rx_buffer: bytearray = field(default_factory=bytearray, init=False, repr=False)
 
-    def identify(self) -> str:
-        self.port.set_read_timeout(0.5)
+    def identify(self, timeout: float = 0.5) -> str:
+        deadline = time.monotonic() + timeout
         try:
+            # No byte of this command is a V2 opcode, so probing a V2 device is harmless.
             self.port.write(b"version\n")
-            response = self.port.readline()
-            if not response:
-                raise RuntimeError("v1: no response to version command")
-            text = response.decode("utf-8", errors="ignore")
-            if "nanovna" in text.lower():
-                return text.strip()
-            raise RuntimeError("v1: device did not identify as NanoVNA V1")
+            while True:
+                response = self._read_line(deadline)
+                if not response:
+                    raise RuntimeError("v1: no response to version command")
+                line = response.strip()
+                if line.startswith(PROMPT):
+                    line = line[len(PROMPT) :].strip()
+                if not line or line == b"version":
+                    continue
+                text = line.decode("utf-8", errors="ignore")
+                if "nanovna" in text.lower():
+                    return text
+                raise RuntimeError("v1: device did not identify as NanoVNA V1")
         finally:
             self.port.set_read_timeout(None)
 
     def set_sweep(self, config: SweepConfig) -> None:
         self.config = config
+        if self.use_scan_command:
+            # ``scan`` carries its own range, nothing to program up front.
+            return
         command = f"sweep {int(config.start)} {int(config.stop)} {config.points}\n".encode()
         self.port.write(command)
 
     def scan(self) -> VNAData:
-        self.port.write(b"data\n")
-        time.sleep(0.1)
-        return self._read_data()
+        # Every block shares the full-sweep buffer; keep the last one's.
+        sweep: Optional[VNAData] = None
+        for block in self.scan_blocks():
+            sweep = block.sweep
+        assert sweep is not None
+        return sweep
+
+    def scan_blocks(self) -> Iterator[SweepBlock]:
+        """Yield the sweep one firmware segment at a time.
+
+        Each block is yielded as soon as its segment has been decoded, so
+        consumers can work on the first segments while later ones are still
+        being measured.  Without the ``scan`` command the sweep arrives as a
+        single block.
+        """
+        if not self.use_scan_command:
+            self.port.write(b"data\n")
+            sweep = self._read_points(b"data", self.config.points)
+            yield block_view(sweep, 0, len(sweep))
+            return
+        segments = self.segments()
+        if len(segments) == 1:
+            sweep = self._scan_segment(segments[0])
+            yield block_view(sweep, 0, len(sweep))
+            return
+        sweep = VNAData.allocate(self.config.points)
+        offset = 0
+        for segment in segments:
+            part = self._scan_segment(segment)
+            end = offset + segment.points
+            sweep.frequencies[offset:end] = part.frequencies
+            sweep.s11[offset:end] = part.s11
+            sweep.s21[offset:end] = part.s21
+            yield block_view(sweep, offset, end)
+            offset = end
+
+    def segments(self) -> list[SweepConfig]:
+        """Split the configured sweep into firmware-sized ``scan`` segments."""
+
+        return split_sweep(self.config, self.max_segment_points)
 
     def close(self) -> None:
         self.port.close()
 
-    def _read_data(self) -> VNAData:
-        data = VNAData(
-            frequencies=[],
-            s11=[],
-            s21=[],
-        )
-        for idx in range(self.config.points):
-            line_bytes = self.port.readline()
-            if not line_bytes:
+    def _scan_segment(self, segment: SweepConfig) -> VNAData:
+        if self.binary_scan:
+            data = self._scan_segment_binary(segment)
+            if data is not None:
+                return data
+        command = (
+            f"scan {round(segment.start)} {round(segment.stop)} {segment.points} {SCAN_OUTMASK}\n"
+        ).encode()
+        self.port.write(command)
+        return self._read_points(b"scan", segment.points)
+
+    def _scan_segment_binary(self, segment: SweepConfig) -> Optional[VNAData]:
+        """Fetch one segment with the binary ``scan`` outmask bit.
+
+        Firmware without binary output answers in text instead: data lines if
+        it ignores the bit, an error message if it rejects it.  Either way
+        binary mode is switched off; the data lines are still used, while an
+        error yields ``None`` so the caller repeats the segment in text mode.
+        """
+        mask = SCAN_OUTMASK | SCAN_OUT_BINARY
+        command = f"scan {round(segment.start)} {round(segment.stop)} {segment.points} {mask}\n".encode()
+        self.port.write(command)
+        deadline = time.monotonic() + self.response_timeout
+        try:
+            while True:
+                line = self._read_line(deadline).strip()
+                if not line:
+                    raise RuntimeError("v1: no response to scan command")
+                if line.startswith(PROMPT):
+                    line = line[len(PROMPT) :].strip()
+                if line.startswith(b"scan"):
+                    break
+            # A binary header starts with the mask byte, which has the high bit
+            # set; any text reply starts with ASCII.
+            first = bytes(self._read_exact(1, deadline))
+            if first[0] != mask & 0xFF:
+                self.binary_scan = False
+                reply = _strip_noise(first + self.port.read_until(PROMPT_TERMINATOR))
+                if _count_lines(reply) < segment.points:
+                    return None
+                return self._parse_block(reply, segment.points)
+            rest = bytes(self._read_exact(SCAN_BIN_HEADER.size - 1, deadline))
+            reply_mask, points = SCAN_BIN_HEADER.unpack(first + rest)
+            if reply_mask != mask or points != segment.points:
                 raise RuntimeError(
-                    f"v1: expected {self.config.points} data lines, received {idx}"
-                )
-            line = line_bytes.decode("utf-8", errors="ignore").strip()
-            parts = line.split()
-            if len(parts) < 5:
-                raise ValueError(
-                    f"v1: line {idx + 1} contained {len(parts)} values, expected 5"
+                    f"v1: binary scan header announced mask {reply_mask:#x} and {points} points, "
+                    f"expected {mask:#x} and {segment.points}"
                 )
-            try:
-                freq = float(parts[0])
-                s11_re = float(parts[1])
-                s11_im = float(parts[2])
-                s21_re = float(parts[3])
-                s21_im = float(parts[4])
-            except ValueError as exc:
-                raise ValueError(f"v1: failed to parse float on line {idx + 1}") from exc
-
-            data.frequencies.append(freq)
-            data.s11.append(complex(s11_re, s11_im))
-            data.s21.append(complex(s21_re, s21_im))
+            raw = self._read_exact(points * SCAN_BIN_RECORD_DTYPE.itemsize, deadline)
+        finally:
+            self.port.set_read_timeout(None)
+
+        records = np.frombuffer(raw, dtype=SCAN_BIN_RECORD_DTYPE)
+        data = VNAData.allocate(points)
+        data.frequencies[:] = records["frequency"]
+        data.s11.real = records["s11_re"]
+        data.s11.imag = records["s11_im"]
+        data.s21.real = records["s21_re"]
+        data.s21.imag = records["s21_im"]
         return data
 
+    def _read_exact(self, size: int, deadline: float) -> memoryview:
+        if len(self._rx_buffer) < size:
+            self._rx_buffer = bytearray(size)
+        view = memoryview(self._rx_buffer)[:size]
+        received = 0
+        while received < size:
+            remaining = deadline - time.monotonic()
+            count = 0
+            if remaining > 0:
+                self.port.set_read_timeout(remaining)
+                count = self.port.readinto(view[received:])
+            if not count:
+                raise RuntimeError(f"v1: expected {size} bytes, received {received}")
+            received += count
+        return view
+
+    def _read_line(self, deadline: float) -> bytes:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return b""
+        self.port.set_read_timeout(remaining)
+        return self.port.readline()
+
+    def _next_data_line(self, deadline: float) -> Optional[bytes]:
+        """Return the next data line, skipping command echoes and prompts.
+
+        ``None`` means the deadline expired or the device went back to an
+        idle prompt without sending more data.
+        """
+        while True:
+            raw = self._read_line(deadline)
+            if not raw:
+                return None
+            line = raw.strip()
+            if line.startswith(PROMPT):
+                line = line[len(PROMPT) :].strip()
+                if not raw.endswith(b"\n"):
+                    return None
+            if not line or line[:1].isalpha():
+                continue
+            return line
+
+    def _read_block(self, command: bytes, expected_lines: int, deadline: float) -> bytes:
+        """Read a whole shell response and return only its data lines.
+
+        Reading stops once ``expected_lines`` data lines have arrived, or when
+        the device prints its prompt after echoing ``command``.
+        """
+        echo = re.compile(rb"^(?:ch>[ \t]*)?" + re.escape(command) + rb"\b[^\n]*$", re.MULTILINE)
+        response = bytearray()
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.port.set_read_timeout(remaining)
+                chunk = self.port.read_until(PROMPT_TERMINATOR)
+                if not chunk:
+                    break
+                response.extend(chunk)
+                block = _strip_noise(response)
+                if _count_lines(block) >= expected_lines:
+                    return block
+                if response.endswith(PROMPT_TERMINATOR) and echo.search(response):
+                    return block
+        finally:
+            self.port.set_read_timeout(None)
+        return _strip_noise(response)
+
+    def _parse_block(self, block: bytes, points: int) -> VNAData:
+        """Parse ``points`` whitespace separated rows in one vectorized pass."""
+
+        received = _count_lines(block)
+        if received < points:
+            raise RuntimeError(f"v1: expected {points} data lines, received {received}")
+        try:
+            table = np.loadtxt(
+                io.StringIO(block.decode("utf-8", errors="ignore")),
+                dtype=np.float64,
+                usecols=range(5),
+                ndmin=2,
+                max_rows=points,
+                comments=None,
+            )
+        except ValueError:
+            # Re-parse line by line so the error names the offending line.
+            scratch = VNAData.allocate(points)
+            for idx, line in enumerate(block.splitlines()[:points]):
+                self._parse_line(scratch, idx, line)
+            raise
+        data = VNAData.allocate(points)
+        data.frequencies[:] = table[:, 0]
+        data.s11.real = table[:, 1]
+        data.s11.imag = table[:, 2]
+        data.s21.real = table[:, 3]
+        data.s21.imag = table[:, 4]
+        return data
+
+    def _read_points(self, command: bytes, points: int) -> VNAData:
+        deadline = time.monotonic() + self.response_timeout
+        if self.bulk_read:
+            block = self._read_block(command, points, deadline)
+            return self._parse_block(block, points)
+        data = VNAData.allocate(points)
+        try:
+            for idx in range(points):
+                line_bytes = self._next_data_line(deadline)
+                if line_bytes is None:
+                    raise RuntimeError(
+                        f"v1: expected {points} data lines, received {idx}"
+                    )
+                self._parse_line(data, idx, line_bytes)
+        finally:
+            self.port.set_read_timeout(None)
+        return data
+
+    def _parse_line(self, data: VNAData, idx: int, line_bytes: bytes) -> None:
+        parts = line_bytes.decode("utf-8", errors="ignore").split()
+        if len(parts) < 5:
+            raise ValueError(
+                f"v1: line {idx + 1} contained {len(parts)} values, expected 5"
+            )
+        try:
+            freq = float(parts[0])
+            s11_re = float(parts[1])
+            s11_im = float(parts[2])
+            s21_re = float(parts[3])
+            s21_im = float(parts[4])
+        except ValueError as exc:
+            raise ValueError(f"v1: failed to parse float on line {idx + 1}") from exc
+
+        data.frequencies[idx] = freq
+        data.s11[idx] = complex(s11_re, s11_im)
+        data.s21[idx] = complex(s21_re, s21_im)
+
 
 __all__ = ["V1Driver"]
@@ -2,10 +2,14 @@
 from __future__ import annotations
 
 import struct
+import threading
 from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+import numpy as np
 
 from .util.serial_port import SerialPortInterface
-from .models import SweepConfig, VNAData
+from .models import SweepBlock, SweepConfig, VNAData, block_view, split_sweep
 
 
 OP_NOP = 0x00
@@ -20,20 +24,128 @@ ADDR_SWEEP_POINTS = 0x20
 ADDR_VALS_FIFO = 0x30
 ADDR_DEVICE_VARIANT = 0xF0
 
+RECORD_SIZE = 32
+# OP_READFIFO takes an 8-bit record count, so streaming drains at most this many per request.
+MAX_FIFO_READ = 255
+STREAM_READ_TIMEOUT = 0.5
+STREAM_WAIT_TIMEOUT = 2.0
+DEFAULT_BLOCK_POINTS = 128
+
+# Layout of one 32-byte FIFO record.  The driver maps the fwd0 channel to S11
+# and the rev1 channel to S21.
+FIFO_RECORD_DTYPE = np.dtype(
+    {
+        "names": ["fwd0_re", "fwd0_im", "rev0_re", "rev0_im", "rev1_re", "rev1_im", "freq_index", "reserved"],
+        "formats": ["<f4", "<f4", "<f4", "<f4", "<f4", "<f4", "<u2", "V6"],
+        "offsets": [0, 4, 8, 12, 16, 20, 24, 26],
+        "itemsize": RECORD_SIZE,
+    }
+)
+
+
+def decode_fifo_records(buf: bytes | bytearray | memoryview) -> np.ndarray:
+    """Return a structured, zero-copy view of raw FIFO records in ``buf``."""
+
+    view = memoryview(buf)
+    if view.nbytes % RECORD_SIZE != 0:
+        raise ValueError(f"v2: response length {view.nbytes} is not a multiple of {RECORD_SIZE}")
+    return np.frombuffer(view, dtype=FIFO_RECORD_DTYPE)
+
+
+class SweepRingBuffer:
+    """Fixed-size ring of sweeps assembled from streamed FIFO records.
+
+    Records are placed by their ``freq_index``; a drop in the index marks the
+    start of a new sweep.  Only sweeps in which every point arrived are
+    published, so a stream that starts mid-sweep never yields a torn result.
+    Records are pushed from a single writer thread while any number of
+    readers may call :meth:`latest`.
+    """
+
+    def __init__(self, points: int, depth: int = 4) -> None:
+        if points <= 0:
+            raise ValueError("ring buffer needs at least one point per sweep")
+        if depth < 2:
+            raise ValueError("ring buffer depth must be at least 2")
+        self.points = points
+        self._slots = np.zeros((depth, points), dtype=FIFO_RECORD_DTYPE)
+        self._write_slot = 0
+        self._filled = 0
+        self._last_index = -1
+        self._latest = -1
+        self._sequence = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def sequence(self) -> int:
+        """Number of complete sweeps published so far."""
+
+        with self._cond:
+            return self._sequence
+
+    def push(self, records: np.ndarray) -> None:
+        indices = records["freq_index"].astype(np.int64)
+        bounds = [0, *(np.flatnonzero(np.diff(indices) <= 0) + 1).tolist(), len(records)]
+        for first, end in zip(bounds[:-1], bounds[1:]):
+            segment_indices = indices[first:end]
+            if segment_indices[0] <= self._last_index:
+                # New sweep started before the previous one completed.
+                self._filled = 0
+            valid = segment_indices < self.points
+            self._slots[self._write_slot][segment_indices[valid]] = records[first:end][valid]
+            self._filled += int(np.count_nonzero(valid))
+            self._last_index = int(segment_indices[-1])
+            if self._filled >= self.points and self._last_index >= self.points - 1:
+                self._publish()
+
+    def latest(self, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """Return a copy of the newest complete sweep, waiting up to ``timeout`` for the first."""
+
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._latest >= 0 or self._closed, timeout):
+                return None
+            if self._latest < 0:
+                return None
+            return self._slots[self._latest].copy()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _publish(self) -> None:
+        with self._cond:
+            self._latest = self._write_slot
+            self._sequence += 1
+            self._write_slot = (self._write_slot + 1) % len(self._slots)
+            self._cond.notify_all()
+        self._filled = 0
+        self._last_index = -1
+
 
 @dataclass
 class V2Driver:
     port: SerialPortInterface
     config: SweepConfig = field(default_factory=lambda: SweepConfig(0.0, 0.0, 0))
+    max_segment_points: int = 1024
 
     def __post_init__(self) -> None:
+        self._rx_buffer = bytearray()
+        # Last write command sent per register address, used to skip no-op writes.
+        self._register_shadow: dict[int, bytes] = {}
+        self._ring: Optional[SweepRingBuffer] = None
+        self._stream_thread: Optional[threading.Thread] = None
+        self._stream_stop = threading.Event()
+        self._stream_error: Optional[BaseException] = None
+        self._stream_depth = 4
         self._reset_protocol()
 
     def _reset_protocol(self) -> None:
         self.port.write(bytes(8))
 
-    def identify(self) -> str:
-        self.port.set_read_timeout(0.5)
+    def identify(self, timeout: float = 0.5) -> str:
+        self.port.set_read_timeout(timeout)
         try:
             self.port.write(bytes([OP_READ, ADDR_DEVICE_VARIANT]))
             buf = self._read_exact(1)
@@ -45,80 +157,290 @@ class V2Driver:
             self.port.set_read_timeout(None)
 
     def set_sweep(self, config: SweepConfig) -> None:
+        streaming = self.streaming
+        if streaming:
+            self.stop_streaming()
         self.config = config
-        step = 0.0
-        if config.points > 1:
-            step = (config.stop - config.start) / float(config.points - 1)
-        self._write_reg_float64(ADDR_SWEEP_START, config.start)
-        self._write_reg_float64(ADDR_SWEEP_STEP, step)
-        self._write_reg16(ADDR_SWEEP_POINTS, config.points)
+        if self.segmented:
+            # Each segment is programmed right before it is read in scan().
+            segment_points = max(segment.points for segment in self.segments())
+        else:
+            segment_points = config.points
+            self._write_registers(self._sweep_registers(config.start, self._step(), config.points))
+        if len(self._rx_buffer) < segment_points * RECORD_SIZE:
+            self._rx_buffer = bytearray(segment_points * RECORD_SIZE)
+        if streaming:
+            self.start_streaming(self._stream_depth)
 
     def scan(self) -> VNAData:
         if self.config.points <= 0:
             raise RuntimeError("v2: sweep not configured or zero points requested")
+        if self._ring is not None:
+            return self._latest_streamed(self._ring)
+        if self.segmented:
+            # Every block shares the full-sweep buffer; keep the last one's.
+            sweep: Optional[VNAData] = None
+            for block in self._segment_blocks():
+                sweep = block.sweep
+            assert sweep is not None
+            return sweep
         self.port.write(bytes([OP_READFIFO, ADDR_VALS_FIFO, 0x00]))
-        expected = self.config.points * 32
+        expected = self.config.points * RECORD_SIZE
         raw = self._read_exact(expected)
         return self._parse_binary_data(raw)
 
+    @property
+    def segmented(self) -> bool:
+        """Whether the configured sweep exceeds what the device can take in one go."""
+
+        return self.config.points > self.max_segment_points
+
+    def segments(self) -> list[SweepConfig]:
+        return split_sweep(self.config, self.max_segment_points)
+
+    def _segment_blocks(self) -> Iterator[SweepBlock]:
+        """Acquire a segmented sweep, yielding one block per segment.
+
+        Programming the next segment and requesting its FIFO is sent in the
+        same write as soon as the current segment's bytes are in, so the
+        device sweeps segment ``k + 1`` while the host decodes segment ``k``.
+        """
+        points = self.config.points
+        step = self._step()
+        sweep = VNAData.allocate(points)
+        sweep.frequencies[:] = self._grid(points)
+        read_fifo = bytes([OP_READFIFO, ADDR_VALS_FIFO, 0x00])
+        offsets = []
+        first = 0
+        for segment in self.segments():
+            offsets.append((first, first + segment.points))
+            first += segment.points
+
+        def program(index: int) -> None:
+            begin, end = offsets[index]
+            registers = self._sweep_registers(self.config.start + step * begin, step, end - begin)
+            self._write_registers(registers, trailer=read_fifo)
+
+        program(0)
+        pending: Optional[int] = None
+        try:
+            for index, (begin, end) in enumerate(offsets):
+                raw = self._read_exact((end - begin) * RECORD_SIZE)
+                pending = None
+                if index + 1 < len(offsets):
+                    program(index + 1)
+                    pending = index + 1
+                records = decode_fifo_records(raw)
+                sweep.s11.real[begin:end] = records["fwd0_re"]
+                sweep.s11.imag[begin:end] = records["fwd0_im"]
+                sweep.s21.real[begin:end] = records["rev1_re"]
+                sweep.s21.imag[begin:end] = records["rev1_im"]
+                yield block_view(sweep, begin, end)
+        except GeneratorExit:
+            if pending is not None:
+                begin, end = offsets[pending]
+                self._read_exact((end - begin) * RECORD_SIZE)
+            raise
+
+    def scan_blocks(self, block_points: int = DEFAULT_BLOCK_POINTS) -> Iterator[SweepBlock]:
+        """Yield the sweep in blocks of ``block_points`` as records arrive.
+
+        All blocks share one preallocated :class:`VNAData`.  If the consumer
+        stops iterating early, the rest of the FIFO response is drained so the
+        protocol stays in sync.
+        """
+        points = self.config.points
+        if points <= 0:
+            raise RuntimeError("v2: sweep not configured or zero points requested")
+        if block_points <= 0:
+            raise ValueError("block_points must be positive")
+        if self._ring is not None:
+            sweep = self._latest_streamed(self._ring)
+            yield block_view(sweep, 0, points)
+            return
+        if self.segmented:
+            yield from self._segment_blocks()
+            return
+
+        sweep = VNAData.allocate(points)
+        sweep.frequencies[:] = self._grid(points)
+        self.port.write(bytes([OP_READFIFO, ADDR_VALS_FIFO, 0x00]))
+        received = 0
+        try:
+            while received < points:
+                end = min(points, received + block_points)
+                records = decode_fifo_records(self._read_exact((end - received) * RECORD_SIZE))
+                sweep.s11.real[received:end] = records["fwd0_re"]
+                sweep.s11.imag[received:end] = records["fwd0_im"]
+                sweep.s21.real[received:end] = records["rev1_re"]
+                sweep.s21.imag[received:end] = records["rev1_im"]
+                offset, received = received, end
+                yield block_view(sweep, offset, end)
+        except GeneratorExit:
+            if received < points:
+                self._read_exact((points - received) * RECORD_SIZE)
+            raise
+
     def close(self) -> None:
+        self.stop_streaming()
         self.port.close()
 
-    def _parse_binary_data(self, buf: bytes) -> VNAData:
-        if len(buf) % 32 != 0:
-            raise ValueError(f"v2: response length {len(buf)} is not a multiple of 32")
-        points = len(buf) // 32
+    @property
+    def streaming(self) -> bool:
+        return self._stream_thread is not None
+
+    def start_streaming(self, depth: int = 4) -> None:
+        """Drain the FIFO continuously in a background thread.
+
+        While streaming, :meth:`scan` returns the newest complete sweep from a
+        ring of ``depth`` sweeps instead of issuing its own FIFO read.
+        """
+        if self._stream_thread is not None:
+            return
+        if self.config.points <= 0:
+            raise RuntimeError("v2: sweep not configured or zero points requested")
+        if self.segmented:
+            raise RuntimeError("v2: streaming requires a sweep that fits in one device segment")
+        self._ring = SweepRingBuffer(self.config.points, depth)
+        self._stream_depth = depth
+        self._stream_error = None
+        self._stream_stop.clear()
+        self.port.set_read_timeout(STREAM_READ_TIMEOUT)
+        self._stream_thread = threading.Thread(
+            target=self._stream_loop, args=(self._ring,), name="pyvna-v2-stream", daemon=True
+        )
+        self._stream_thread.start()
+
+    def stop_streaming(self) -> None:
+        thread = self._stream_thread
+        if thread is None:
+            return
+        self._stream_stop.set()
+        thread.join()
+        self._stream_thread = None
+        if self._ring is not None:
+            self._ring.close()
+        self._ring = None
+        self.port.set_read_timeout(None)
+
+    def _stream_loop(self, ring: SweepRingBuffer) -> None:
+        count = min(self.config.points, MAX_FIFO_READ)
+        request = bytes([OP_READFIFO, ADDR_VALS_FIFO, count])
+        try:
+            while not self._stream_stop.is_set():
+                self.port.write(request)
+                ring.push(decode_fifo_records(self._read_exact(count * RECORD_SIZE)))
+        except Exception as exc:
+            if not self._stream_stop.is_set():
+                self._stream_error = exc
+        finally:
+            ring.close()
+
+    def _latest_streamed(self, ring: SweepRingBuffer) -> VNAData:
+        records = ring.latest(STREAM_WAIT_TIMEOUT)
+        if self._stream_error is not None:
+            raise RuntimeError(f"v2: streaming stopped: {self._stream_error}") from self._stream_error
+        if records is None:
+            raise RuntimeError("v2: no complete sweep received from the stream")
+        return self._records_to_data(records)
+
+    def _parse_binary_data(self, buf: bytes | memoryview) -> VNAData:
+        records = decode_fifo_records(buf)
+        points = len(records)
         if points == 0:
             raise ValueError("v2: device returned an empty response")
         if points != self.config.points:
             raise ValueError(
                 f"v2: device returned {points} points, expected {self.config.points}"
             )
-        data = VNAData(
-            frequencies=[0.0] * points,
-            s11=[0j] * points,
-            s21=[0j] * points,
-        )
+        return self._records_to_data(records)
+
+    def _step(self) -> float:
+        if self.config.points > 1:
+            return (self.config.stop - self.config.start) / float(self.config.points - 1)
+        return 0.0
+
+    def _grid(self, points: int) -> np.ndarray:
         step = 0.0
         if points > 1:
             step = (self.config.stop - self.config.start) / float(points - 1)
-        for idx in range(points):
-            offset = idx * 32
-            chunk = buf[offset : offset + 32]
-            s11_re = struct.unpack_from("<f", chunk, 0)[0]
-            s11_im = struct.unpack_from("<f", chunk, 4)[0]
-            s21_re = struct.unpack_from("<f", chunk, 16)[0]
-            s21_im = struct.unpack_from("<f", chunk, 20)[0]
-            data.frequencies[idx] = self.config.start + step * idx
-            data.s11[idx] = complex(float(s11_re), float(s11_im))
-            data.s21[idx] = complex(float(s21_re), float(s21_im))
+        return self.config.start + step * np.arange(points, dtype=np.float64)
+
+    def _records_to_data(self, records: np.ndarray) -> VNAData:
+        points = len(records)
+        data = VNAData.allocate(points)
+        data.frequencies[:] = self._grid(points)
+        data.s11.real = records["fwd0_re"]
+        data.s11.imag = records["fwd0_im"]
+        data.s21.real = records["rev1_re"]
+        data.s21.imag = records["rev1_im"]
         return data
 
-    def _write_reg_float64(self, addr: int, value: float) -> None:
+    def invalidate_registers(self) -> None:
+        """Forget the shadowed register state so the next writes are sent unconditionally."""
+
+        self._register_shadow.clear()
+
+    def _sweep_registers(self, start: float, step: float, points: int) -> list[tuple[int, bytes]]:
+        return [
+            (ADDR_SWEEP_START, self._encode_reg_float64(ADDR_SWEEP_START, start)),
+            (ADDR_SWEEP_STEP, self._encode_reg_float64(ADDR_SWEEP_STEP, step)),
+            (ADDR_SWEEP_POINTS, self._encode_reg16(ADDR_SWEEP_POINTS, points)),
+        ]
+
+    def _write_registers(self, writes: list[tuple[int, bytes]], trailer: bytes = b"") -> None:
+        """Send every changed register write, followed by ``trailer``, in a single port write."""
+
+        batch = bytearray()
+        pending: dict[int, bytes] = {}
+        for addr, command in writes:
+            if self._register_shadow.get(addr) == command:
+                continue
+            batch.extend(command)
+            pending[addr] = command
+        batch.extend(trailer)
+        if not batch:
+            return
+        try:
+            self.port.write(bytes(batch))
+        except Exception:
+            self.invalidate_registers()
+            raise
+        self._register_shadow.update(pending)
+
+    @staticmethod
+    def _encode_reg_float64(addr: int, value: float) -> bytes:
         payload = bytearray(10)
         payload[0] = OP_WRITE4 + 2
         payload[1] = addr & 0xFF
         struct.pack_into("<d", payload, 2, value)
-        self.port.write(payload)
+        return bytes(payload)
 
-    def _write_reg16(self, addr: int, value: int) -> None:
+    @staticmethod
+    def _encode_reg16(addr: int, value: int) -> bytes:
         payload = bytearray(4)
         payload[0] = OP_WRITE2
         payload[1] = addr & 0xFF
         struct.pack_into("<H", payload, 2, value & 0xFFFF)
-        self.port.write(payload)
-
-    def _read_exact(self, size: int) -> bytes:
-        chunks = bytearray()
-        while len(chunks) < size:
-            remaining = size - len(chunks)
-            chunk = self.port.read(remaining)
-            if not chunk:
+        return bytes(payload)
+
+    def _read_exact(self, size: int) -> memoryview:
+        """Read exactly ``size`` bytes into the driver's reusable receive buffer.
+
+        The returned view is only valid until the next read on this driver.
+        """
+        if len(self._rx_buffer) < size:
+            self._rx_buffer = bytearray(size)
+        view = memoryview(self._rx_buffer)[:size]
+        received = 0
+        while received < size:
+            count = self.port.readinto(view[received:])
+            if not count:
                 raise RuntimeError(
-                    f"v2: expected {size} bytes, received {len(chunks)}"
+                    f"v2: expected {size} bytes, received {received}"
                 )
-            chunks.extend(chunk)
-        return bytes(chunks)
+            received += count
+        return view
 
 
-__all__ = ["V2Driver"]
+__all__ = ["V2Driver", "SweepRingBuffer", "FIFO_RECORD_DTYPE", "decode_fifo_records"]
@@ -0,0 +1,202 @@
+"""Binary encodings of sweep results for transport."""
+from __future__ import annotations
+
+import importlib.util
+import io
+import json
+import struct
+from typing import Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from .models import CHUNK_POINTS, VNAData
+
+MEDIA_TOUCHSTONE = "text/plain"
+MEDIA_NDJSON = "application/x-ndjson"
+MEDIA_RAW_F32 = "application/vnd.pyvna.f32"
+MEDIA_RAW_F64 = "application/vnd.pyvna.f64"
+MEDIA_NPY = "application/x-npy"
+MEDIA_ARROW = "application/vnd.apache.arrow.stream"
+
+# Raw header: magic, format version, bytes per float, reserved, point count.
+# It is followed by ``points`` frequencies, then ``points`` interleaved
+# (re, im) pairs for S11 and again for S21, all little-endian.
+RAW_MAGIC = b"PVNA"
+RAW_VERSION = 1
+RAW_HEADER = struct.Struct("<4sBBHI")
+
+NPY_DTYPE = np.dtype([("frequency", "<f8"), ("s11", "<c16"), ("s21", "<c16")])
+
+
+class FormatUnavailableError(RuntimeError):
+    """Raised when an encoding needs an optional dependency that is missing."""
+
+
+def encode_raw(data: VNAData, dtype: np.dtype | type = np.float64) -> bytes:
+    """Encode ``data`` as a raw header plus little-endian float columns."""
+
+    dtype = np.dtype(dtype).newbyteorder("<")
+    if dtype.kind != "f" or dtype.itemsize not in (4, 8):
+        raise ValueError("raw encoding supports float32 and float64 only")
+    complex_dtype = np.dtype(f"<c{dtype.itemsize * 2}")
+    header = RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, dtype.itemsize, 0, len(data))
+    return b"".join(
+        (
+            header,
+            np.ascontiguousarray(data.frequencies, dtype=dtype).data,
+            np.ascontiguousarray(data.s11, dtype=complex_dtype).data,
+            np.ascontiguousarray(data.s21, dtype=complex_dtype).data,
+        )
+    )
+
+
+def decode_raw(payload: bytes) -> VNAData:
+    """Inverse of :func:`encode_raw`."""
+
+    magic, version, size, _, points = RAW_HEADER.unpack_from(payload)
+    if magic != RAW_MAGIC or version != RAW_VERSION or size not in (4, 8):
+        raise ValueError("not a raw PyVNA sweep")
+    real = np.dtype(f"<f{size}")
+    cplx = np.dtype(f"<c{size * 2}")
+    offset = RAW_HEADER.size
+    frequencies = np.frombuffer(payload, dtype=real, count=points, offset=offset)
+    offset += points * real.itemsize
+    s11 = np.frombuffer(payload, dtype=cplx, count=points, offset=offset)
+    offset += points * cplx.itemsize
+    s21 = np.frombuffer(payload, dtype=cplx, count=points, offset=offset)
+    return VNAData(frequencies=frequencies, s11=s11, s21=s21)
+
+
+def encode_npy(data: VNAData) -> bytes:
+    """Encode ``data`` as a ``.npy`` file holding a structured array."""
+
+    table = np.empty(len(data), dtype=NPY_DTYPE)
+    table["frequency"] = data.frequencies
+    table["s11"] = data.s11
+    table["s21"] = data.s21
+    out = io.BytesIO()
+    np.lib.format.write_array(out, table, allow_pickle=False)
+    return out.getvalue()
+
+
+def encode_arrow(data: VNAData) -> bytes:
+    """Encode ``data`` as an Arrow IPC stream; requires ``pyarrow``."""
+
+    try:
+        import pyarrow as pa
+    except ImportError as exc:
+        raise FormatUnavailableError("Arrow encoding requires pyarrow") from exc
+    table = pa.table(
+        {
+            "frequency": data.frequencies,
+            "s11_re": np.ascontiguousarray(data.s11.real),
+            "s11_im": np.ascontiguousarray(data.s11.imag),
+            "s21_re": np.ascontiguousarray(data.s21.real),
+            "s21_im": np.ascontiguousarray(data.s21.imag),
+        }
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def iter_ndjson(data: VNAData, chunk_points: int = CHUNK_POINTS) -> Iterator[str]:
+    """Yield one JSON object per point, ``chunk_points`` lines at a time."""
+
+    if chunk_points <= 0:
+        raise ValueError("chunk_points must be positive")
+    for start in range(0, len(data), chunk_points):
+        end = start + chunk_points
+        rows = zip(
+            data.frequencies[start:end].tolist(),
+            data.s11[start:end].tolist(),
+            data.s21[start:end].tolist(),
+        )
+        yield "".join(
+            json.dumps({"frequency": freq, "s11": [s11.real, s11.imag], "s21": [s21.real, s21.imag]}) + "\n"
+            for freq, s11, s21 in rows
+        )
+
+
+# Text formats are written incrementally; binary ones are encoded in one go.
+STREAM_ENCODERS: Dict[str, Callable[[VNAData], Iterator[str]]] = {
+    MEDIA_TOUCHSTONE: VNAData.iter_touchstone,
+    MEDIA_NDJSON: iter_ndjson,
+}
+
+ENCODERS: Dict[str, Callable[[VNAData], bytes | str]] = {
+    MEDIA_TOUCHSTONE: VNAData.to_touchstone,
+    MEDIA_NDJSON: lambda data: "".join(iter_ndjson(data)),
+    MEDIA_RAW_F64: lambda data: encode_raw(data, np.float64),
+    MEDIA_RAW_F32: lambda data: encode_raw(data, np.float32),
+    MEDIA_NPY: encode_npy,
+    MEDIA_ARROW: encode_arrow,
+}
+
+
+def available_media_types() -> list[str]:
+    """Media types that can be produced with the installed packages."""
+
+    has_arrow = importlib.util.find_spec("pyarrow") is not None
+    return [media for media in ENCODERS if media != MEDIA_ARROW or has_arrow]
+
+
+def negotiate(accept: Optional[str], available: Optional[list[str]] = None) -> Optional[str]:
+    """Pick the best media type in ``available`` for an ``Accept`` header.
+
+    ``available`` defaults to :func:`available_media_types`.  A missing header
+    or a wildcard yields the first available type; ``None`` means nothing
+    acceptable is available.
+    """
+    available = available_media_types() if available is None else available
+    if not accept:
+        return available[0] if available else None
+    best: Optional[str] = None
+    best_quality = 0.0
+    for entry in accept.split(","):
+        media, _, params = entry.strip().partition(";")
+        media = media.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality <= best_quality:
+            continue
+        match = _match(media, available)
+        if match is not None:
+            best, best_quality = match, quality
+    return best
+
+
+def _match(media: str, available: list[str]) -> Optional[str]:
+    if media == "*/*":
+        return available[0] if available else None
+    if media.endswith("/*"):
+        prefix = media[:-1]
+        return next((item for item in available if item.startswith(prefix)), None)
+    return media if media in available else None
+
+
+__all__ = [
+    "ENCODERS",
+    "FormatUnavailableError",
+    "MEDIA_ARROW",
+    "MEDIA_NDJSON",
+    "MEDIA_NPY",
+    "MEDIA_RAW_F32",
+    "MEDIA_RAW_F64",
+    "MEDIA_TOUCHSTONE",
+    "STREAM_ENCODERS",
+    "available_media_types",
+    "decode_raw",
+    "encode_arrow",
+    "encode_npy",
+    "encode_raw",
+    "iter_ndjson",
+    "negotiate",
+]
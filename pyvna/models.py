@@ -1,9 +1,19 @@
 """Core data structures shared across the PyVNA modules."""
 from __future__ import annotations
 
+import io
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import List
+from typing import Iterator
+
+import numpy as np
+
+FREQUENCY_DTYPE = np.dtype(np.float64)
+SPARAM_DTYPE = np.dtype(np.complex128)
+
+# Points formatted per chunk by the streaming writers.
+CHUNK_POINTS = 1024
+
 
 @dataclass
 class SweepConfig:
@@ -12,32 +22,142 @@ class SweepConfig:
     points: int
 
 
-@dataclass
+def split_sweep(config: SweepConfig, max_points: int) -> list[SweepConfig]:
+    """Split ``config`` into as few segments of at most ``max_points`` as possible.
+
+    Segment boundaries lie on the frequency grid of the full sweep, so the
+    stitched result has the same points as one large sweep would.
+    """
+    if max_points <= 0:
+        raise ValueError("max_points must be positive")
+    if config.points <= max_points:
+        return [config]
+    count = -(-config.points // max_points)
+    step = (config.stop - config.start) / float(config.points - 1)
+    segments: list[SweepConfig] = []
+    first = 0
+    for idx in range(count):
+        size = config.points // count + (1 if idx < config.points % count else 0)
+        last = first + size - 1
+        segments.append(
+            SweepConfig(start=config.start + step * first, stop=config.start + step * last, points=size)
+        )
+        first = last + 1
+    return segments
+
+
+def _empty_frequencies() -> np.ndarray:
+    return np.empty(0, dtype=FREQUENCY_DTYPE)
+
+
+def _empty_sparams() -> np.ndarray:
+    return np.empty(0, dtype=SPARAM_DTYPE)
+
+
+@dataclass(eq=False)
 class VNAData:
-    frequencies: List[float] = field(default_factory=list)
-    s11: List[complex] = field(default_factory=list)
-    s21: List[complex] = field(default_factory=list)
+    """Sweep result stored as contiguous columns.
+
+    ``frequencies`` is a ``float64`` array, ``s11`` and ``s21`` are
+    ``complex128`` arrays.  Sequences passed to the constructor are converted
+    once; arrays that already have the right dtype are used without copying.
+    """
+
+    frequencies: np.ndarray = field(default_factory=_empty_frequencies)
+    s11: np.ndarray = field(default_factory=_empty_sparams)
+    s21: np.ndarray = field(default_factory=_empty_sparams)
+
+    def __post_init__(self) -> None:
+        self.frequencies = np.ascontiguousarray(self.frequencies, dtype=FREQUENCY_DTYPE)
+        self.s11 = np.ascontiguousarray(self.s11, dtype=SPARAM_DTYPE)
+        self.s21 = np.ascontiguousarray(self.s21, dtype=SPARAM_DTYPE)
+
+    @classmethod
+    def allocate(cls, points: int) -> "VNAData":
+        """Return a zero-filled container with room for ``points`` samples."""
+
+        return cls(
+            frequencies=np.zeros(points, dtype=FREQUENCY_DTYPE),
+            s11=np.zeros(points, dtype=SPARAM_DTYPE),
+            s21=np.zeros(points, dtype=SPARAM_DTYPE),
+        )
+
+    def __len__(self) -> int:
+        return len(self.frequencies)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, VNAData):
+            return NotImplemented
+        return (
+            np.array_equal(self.frequencies, other.frequencies)
+            and np.array_equal(self.s11, other.s11)
+            and np.array_equal(self.s21, other.s21)
+        )
 
     def to_touchstone(self) -> str:
-        lines = ["! PyVNA Data Export", f"! Date: {datetime.now(timezone.utc).isoformat()}", "# Hz S RI R 50"]
-        for idx in range(len(self.frequencies)):
-            freq = self.frequencies[idx]
-            s11 = self.s11[idx]
-            s21 = self.s21[idx]
-            lines.append(
-                f"{freq:.6f} {s11.real:.6f} {s11.imag:.6f} {s21.real:.6f} {s21.imag:.6f}"
-            )
-        return "\n".join(lines) + "\n"
-
-    def calculate_vswr(self) -> List[float]:
-        vswr: List[float] = []
-        for reflection in self.s11:
-            gamma = abs(reflection)
-            if gamma >= 1.0:
-                vswr.append(9999.0)
-            else:
-                vswr.append((1 + gamma) / (1 - gamma))
+        return "".join(self.iter_touchstone())
+
+    def iter_touchstone(self, chunk_points: int = CHUNK_POINTS) -> Iterator[str]:
+        """Yield the Touchstone document in chunks of ``chunk_points`` rows.
+
+        Only one chunk is formatted at a time, so memory use does not grow
+        with the sweep length.
+        """
+        if chunk_points <= 0:
+            raise ValueError("chunk_points must be positive")
+        header = ["! PyVNA Data Export", f"! Date: {datetime.now(timezone.utc).isoformat()}", "# Hz S RI R 50"]
+        yield "\n".join(header) + "\n"
+        for start in range(0, len(self), chunk_points):
+            end = start + chunk_points
+            s11 = self.s11[start:end]
+            s21 = self.s21[start:end]
+            table = np.column_stack((self.frequencies[start:end], s11.real, s11.imag, s21.real, s21.imag))
+            body = io.StringIO()
+            np.savetxt(body, table, fmt="%.6f", delimiter=" ", newline="\n")
+            yield body.getvalue()
+
+    def calculate_vswr(self) -> np.ndarray:
+        gamma = np.abs(self.s11)
+        vswr = np.full(gamma.shape, 9999.0)
+        ok = gamma < 1.0
+        vswr[ok] = (1 + gamma[ok]) / (1 - gamma[ok])
         return vswr
 
 
-__all__ = ["SweepConfig", "VNAData"]
+@dataclass
+class SweepBlock:
+    """Consecutive points of a sweep delivered before the sweep completes.
+
+    ``data`` covers points ``offset`` to ``offset + len(data)`` and shares
+    memory with ``sweep``, the full result that is complete once the last
+    block has been delivered.
+    """
+
+    offset: int
+    data: VNAData
+    sweep: VNAData
+
+    @property
+    def end(self) -> int:
+        return self.offset + len(self.data)
+
+    @property
+    def complete(self) -> bool:
+        return self.end == len(self.sweep)
+
+
+def block_view(sweep: VNAData, offset: int, end: int) -> SweepBlock:
+    """Return a :class:`SweepBlock` viewing ``sweep[offset:end]`` without copying."""
+
+    return SweepBlock(
+        offset=offset,
+        data=VNAData(
+            frequencies=sweep.frequencies[offset:end],
+            s11=sweep.s11[offset:end],
+            s21=sweep.s21[offset:end],
+        ),
+        sweep=sweep,
+    )
+
+
+__all__ = ["SweepBlock", "SweepConfig", "VNAData", "block_view", "split_sweep"]
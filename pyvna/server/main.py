@@ -1,14 +1,211 @@
 """Example HTTP server mirroring the Go reference implementation."""
 from __future__ import annotations
 
+import asyncio
+import json
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Set
 
-from fastapi import FastAPI, HTTPException, Response
-from fastapi.responses import PlainTextResponse
+from fastapi import FastAPI, Header, HTTPException, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+from pydantic import BaseModel
+
+from ..driver import DeviceUnavailableError, VNAPool, is_device_failure
+from ..formats import ENCODERS, STREAM_ENCODERS, available_media_types, encode_raw, negotiate
+from ..models import SweepConfig, VNAData
+
+# Scans queued or running per device before further requests get a 503.
+MAX_PENDING_SCANS = 8
+# Devices with their own executor before requests for new ports get a 503.
+MAX_DEVICE_EXECUTORS = 64
+# Pause before a live feed retries a device whose backlog was full.
+LIVE_BUSY_RETRY = 0.05
+# Devices unused for this many seconds are closed by the pool supervisor.
+DEVICE_IDLE_TTL = 300.0
+
+DEFAULT_SWEEP = SweepConfig(start=1e6, stop=900e6, points=101)
+# Upper bound on requested points; larger sweeps would allocate unbounded buffers.
+MAX_SWEEP_POINTS = 100_000
+
+# Named sweeps selectable with ``preset``; explicit start/stop/points override them.
+SWEEP_PRESETS: Dict[str, SweepConfig] = {
+    "default": DEFAULT_SWEEP,
+    "hf": SweepConfig(start=1e6, stop=30e6, points=291),
+    "vhf": SweepConfig(start=30e6, stop=300e6, points=271),
+    "uhf": SweepConfig(start=300e6, stop=900e6, points=301),
+    "wide": SweepConfig(start=50e3, stop=900e6, points=1001),
+}
+
+
+class DeviceBusyError(RuntimeError):
+    """Raised when a device has too many scans queued or too many devices are active."""
+
+
+class DeviceExecutors:
+    """One single-thread executor per device with a bounded backlog.
+
+    Blocking device work runs here instead of in the server's shared thread
+    pool, so slow devices only delay their own requests.  Executors for
+    ports that fail or are closed should be dropped with :meth:`discard`.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_SCANS, max_devices: int = MAX_DEVICE_EXECUTORS) -> None:
+        if max_pending <= 0 or max_devices <= 0:
+            raise ValueError("max_pending and max_devices must be positive")
+        self._max_pending = max_pending
+        self._max_devices = max_devices
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, port: str, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            pending = self._pending.get(port, 0)
+            if pending >= self._max_pending:
+                raise DeviceBusyError(f"device {port} has {pending} scans pending")
+            executor = self._executors.get(port)
+            if executor is None:
+                if len(self._executors) >= self._max_devices:
+                    raise DeviceBusyError(f"too many active devices ({len(self._executors)})")
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"pyvna-{port}")
+                self._executors[port] = executor
+            # Submitted under the lock so discard() cannot shut the executor
+            # down in between.
+            try:
+                future = executor.submit(fn, *args)
+            except RuntimeError as exc:  # interpreter shutdown
+                raise DeviceBusyError(f"device {port} is shutting down") from exc
+            self._pending[port] = pending + 1
+        # Outside the lock: the callback runs inline if the work already finished.
+        future.add_done_callback(lambda _: self._release(port))
+        return future
+
+    def pending(self, port: str) -> int:
+        with self._lock:
+            return self._pending.get(port, 0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._executors)
+
+    def discard(self, port: str) -> None:
+        """Drop the executor of ``port``; work already queued on it still runs."""
+
+        with self._lock:
+            executor = self._executors.pop(port, None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, port: str) -> None:
+        with self._lock:
+            remaining = self._pending[port] - 1
+            if remaining:
+                self._pending[port] = remaining
+            else:
+                del self._pending[port]
+
+
+class LiveSubscriber:
+    """Holds at most one undelivered sweep; newer sweeps replace stale ones."""
+
+    def __init__(self) -> None:
+        self.dropped = 0
+        self._latest: Optional[VNAData] = None
+        self._error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+
+    def offer(self, data: VNAData) -> None:
+        if self._latest is not None:
+            self.dropped += 1
+        self._latest = data
+        self._ready.set()
+
+    def fail(self, error: BaseException) -> None:
+        self._error = error
+        self._ready.set()
+
+    async def next(self) -> VNAData:
+        await self._ready.wait()
+        data, self._latest = self._latest, None
+        if data is None:
+            assert self._error is not None
+            raise self._error
+        if self._error is None:
+            # Stay ready after a failure so the error follows the last sweep.
+            self._ready.clear()
+        return data
+
+
+class LiveSweeps:
+    """Shares one acquisition loop among all subscribers of a device and sweep.
+
+    Each acquisition is submitted to the device's executor like any other
+    scan, so live feeds and one-off requests take turns on the device.
+    """
+
+    def __init__(
+        self,
+        executors: DeviceExecutors,
+        acquire: Callable[[str, SweepConfig], VNAData],
+    ) -> None:
+        self._executors = executors
+        self._acquire = acquire
+        self._feeds: Dict[tuple, Set[LiveSubscriber]] = {}
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+
+    @asynccontextmanager
+    async def subscribe(self, port: str, sweep: SweepConfig) -> AsyncIterator[LiveSubscriber]:
+        key = (port, float(sweep.start), float(sweep.stop), int(sweep.points))
+        subscriber = LiveSubscriber()
+        subscribers = self._feeds.get(key)
+        if subscribers is None:
+            subscribers = self._feeds[key] = set()
+            self._tasks[key] = asyncio.get_running_loop().create_task(
+                self._run(key, port, sweep, subscribers)
+            )
+        subscribers.add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            subscribers.discard(subscriber)
+            if not subscribers and self._feeds.get(key) is subscribers:
+                del self._feeds[key]
+                self._tasks.pop(key).cancel()
+
+    def feeds(self) -> int:
+        return len(self._feeds)
+
+    async def _run(self, key: tuple, port: str, sweep: SweepConfig, subscribers: Set[LiveSubscriber]) -> None:
+        while subscribers:
+            try:
+                future = self._executors.submit(port, self._acquire, port, sweep)
+            except DeviceBusyError:
+                await asyncio.sleep(LIVE_BUSY_RETRY)
+                continue
+            try:
+                data = await asyncio.wrap_future(future)
+            except Exception as exc:
+                # Unregister first so later subscribers start a fresh loop.
+                if self._feeds.get(key) is subscribers:
+                    del self._feeds[key]
+                    del self._tasks[key]
+                for subscriber in list(subscribers):
+                    subscriber.fail(exc)
+                return
+            for subscriber in list(subscribers):
+                subscriber.offer(data)
 
-from ..driver import VNAPool
-from ..models import SweepConfig
 
 app = FastAPI(title="PyVNA Server", version="1.0.0")
 scan_duration = Histogram(
@@ -16,37 +213,253 @@ scan_duration = Histogram(
     "Duration of VNA scan operations",
     labelnames=("port",),
 )
-pool = VNAPool()
+pool = VNAPool(idle_ttl=DEVICE_IDLE_TTL)
+device_executors = DeviceExecutors()
+# Executors only live while the pool holds the device open.
+pool.on_close(device_executors.discard)
+# Scans in flight, keyed by port, sweep, max_age and calibration version.
+_inflight_scans: Dict[tuple, "asyncio.Future[VNAData]"] = {}
+
+
+@app.on_event("startup")
+def _startup() -> None:
+    pool.start_supervisor()
 
 
 @app.on_event("shutdown")
-def _shutdown() -> None:  # pragma: no cover - network integration
+def _shutdown() -> None:
+    device_executors.shutdown()
     pool.close_all()
 
 
-@app.get("/api/v1/scan", response_class=PlainTextResponse)
-def scan(port: str | None = None) -> str:
+class ScanRequest(BaseModel):
+    port: str
+    preset: Optional[str] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    points: Optional[int] = None
+    max_age: Optional[float] = None
+
+
+def resolve_sweep(
+    preset: str | None = None,
+    start: float | None = None,
+    stop: float | None = None,
+    points: int | None = None,
+) -> SweepConfig:
+    """Build the requested sweep from a preset and explicit overrides."""
+
+    name = preset or "default"
+    base = SWEEP_PRESETS.get(name)
+    if base is None:
+        raise HTTPException(status_code=400, detail=f"unknown sweep preset '{name}'")
+    sweep = SweepConfig(
+        start=base.start if start is None else start,
+        stop=base.stop if stop is None else stop,
+        points=base.points if points is None else points,
+    )
+    if sweep.start < 0 or sweep.start >= sweep.stop or sweep.points <= 0:
+        raise HTTPException(status_code=400, detail="invalid sweep parameters")
+    if sweep.points > MAX_SWEEP_POINTS:
+        raise HTTPException(status_code=400, detail=f"points must not exceed {MAX_SWEEP_POINTS}")
+    return sweep
+
+
+# The scan endpoints return whichever encoding the Accept header selects.
+_SCAN_RESPONSES: Dict[int | str, Dict[str, Any]] = {
+    200: {
+        "description": "One sweep in the negotiated encoding.",
+        "content": {media: {} for media in available_media_types()},
+    },
+    406: {"description": "No acceptable encoding is available."},
+    503: {"description": "The device is busy or unavailable."},
+}
+
+
+@app.get("/api/v1/presets")
+def presets() -> Dict[str, Dict[str, float]]:
+    return {
+        name: {"start": sweep.start, "stop": sweep.stop, "points": sweep.points}
+        for name, sweep in SWEEP_PRESETS.items()
+    }
+
+
+@app.get("/api/v1/scan", response_class=Response, responses=_SCAN_RESPONSES)
+async def scan(
+    port: str | None = None,
+    max_age: float | None = None,
+    preset: str | None = None,
+    start: float | None = None,
+    stop: float | None = None,
+    points: int | None = None,
+    accept: str | None = Header(default=None),
+) -> Response:
     if not port:
         raise HTTPException(status_code=400, detail="query parameter 'port' is required")
+    return await _scan_response(port, resolve_sweep(preset, start, stop, points), max_age, accept)
+
+
+@app.post("/api/v1/scan", response_class=Response, responses=_SCAN_RESPONSES)
+async def scan_json(request: ScanRequest, accept: str | None = Header(default=None)) -> Response:
+    sweep = resolve_sweep(request.preset, request.start, request.stop, request.points)
+    return await _scan_response(request.port, sweep, request.max_age, accept)
+
+
+async def _scan_response(
+    port: str, sweep: SweepConfig, max_age: float | None, accept: str | None
+) -> Response:
+    media_type = negotiate(accept)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"unsupported Accept header: {accept}")
+    data = await _coalesced_scan(port, sweep, max_age)
+    if media_type in STREAM_ENCODERS:
+        return StreamingResponse(_stream_chunks(STREAM_ENCODERS[media_type](data)), media_type=media_type)
+    return Response(content=ENCODERS[media_type](data), media_type=media_type)
+
+
+async def _stream_chunks(chunks: Iterator[str]) -> AsyncIterator[str]:
+    """Format chunks on the event loop, yielding to other tasks between them.
+
+    Handing Starlette a sync iterator would format every chunk on its
+    shared thread pool.
+    """
+    for chunk in chunks:
+        yield chunk
+        await asyncio.sleep(0)
+
+
+async def _coalesced_scan(port: str, sweep: SweepConfig, max_age: float | None) -> VNAData:
+    """Run one scan on the device executor, shared by identical concurrent requests.
+
+    Followers await the owner's scan and take no slot in the device backlog.
+    """
+    vna = pool.peek(port)
+    key = (
+        port,
+        float(sweep.start),
+        float(sweep.stop),
+        int(sweep.points),
+        max_age,
+        # A device that is not open yet will start without a calibration.
+        0 if vna is None else vna.calibration_version,
+    )
+    future = _inflight_scans.get(key)
+    if future is None:
+        try:
+            submitted = device_executors.submit(port, _scan_device, port, sweep, max_age)
+        except DeviceBusyError as exc:
+            raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"}) from exc
+        future = asyncio.wrap_future(submitted)
+        _inflight_scans[key] = future
+
+        def forget(done: "asyncio.Future[VNAData]") -> None:
+            if _inflight_scans.get(key) is done:
+                del _inflight_scans[key]
+            if not done.cancelled():
+                done.exception()  # retrieved here in case every requester went away
+
+        future.add_done_callback(forget)
+    # A disconnecting client must not cancel the scan other requests wait on.
+    return await asyncio.shield(future)
+
+
+def _scan_device(port: str, sweep: SweepConfig, max_age: float | None) -> VNAData:
     try:
         vna = pool.get(port)
+    except DeviceUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"}) from exc
     except Exception as exc:  # pragma: no cover - hardware dependent
         raise HTTPException(status_code=500, detail=f"device error: {exc}") from exc
 
-    sweep = SweepConfig(start=1e6, stop=900e6, points=101)
-    try:
-        vna.set_sweep(sweep)
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"failed to configure sweep: {exc}") from exc
-
     start = time.perf_counter()
     try:
-        data = vna.get_data()
-    except Exception as exc:  # pragma: no cover - hardware dependent
+        # get_data also coalesces with scans that bypass the server executors.
+        data = vna.get_data(sweep, max_age=max_age)
+    except Exception as exc:
+        if is_device_failure(exc):
+            # Let the pool close the device so later requests fail fast until it recovers.
+            pool.report_failure(port, exc)
+        elif isinstance(exc, ValueError):
+            raise HTTPException(
+                status_code=500, detail=f"sweep rejected (invalid sweep or calibration mismatch): {exc}"
+            ) from exc
         raise HTTPException(status_code=500, detail=f"scan failed: {exc}") from exc
     duration = time.perf_counter() - start
     scan_duration.labels(port=port).observe(duration)
-    return data.to_touchstone()
+    return data
+
+
+def _acquire_live(port: str, sweep: SweepConfig) -> VNAData:
+    vna = pool.get(port)
+    try:
+        return vna.get_data(sweep)
+    except Exception as exc:
+        if is_device_failure(exc):
+            pool.report_failure(port, exc)
+        raise
+
+
+live_sweeps = LiveSweeps(device_executors, _acquire_live)
+
+
+@app.websocket("/api/v1/live")
+async def live_websocket(
+    websocket: WebSocket,
+    port: str,
+    preset: str | None = None,
+    start: float | None = None,
+    stop: float | None = None,
+    points: int | None = None,
+) -> None:
+    """Send each new sweep as a raw float64 frame (see :func:`encode_raw`)."""
+
+    try:
+        sweep = resolve_sweep(preset, start, stop, points)
+    except HTTPException as exc:
+        await websocket.close(code=1008, reason=str(exc.detail))
+        return
+    await websocket.accept()
+    try:
+        async with live_sweeps.subscribe(port, sweep) as subscriber:
+            while True:
+                data = await subscriber.next()
+                await websocket.send_bytes(encode_raw(data))
+    except WebSocketDisconnect:
+        return
+    except Exception as exc:
+        await websocket.close(code=1011, reason=str(exc)[:120])
+
+
+@app.get("/api/v1/live/sse")
+async def live_events(
+    port: str,
+    preset: str | None = None,
+    start: float | None = None,
+    stop: float | None = None,
+    points: int | None = None,
+) -> StreamingResponse:
+    """Server-sent events, one ``sweep`` event with JSON columns per sweep."""
+
+    sweep = resolve_sweep(preset, start, stop, points)
+
+    async def events() -> AsyncIterator[str]:
+        async with live_sweeps.subscribe(port, sweep) as subscriber:
+            while True:
+                try:
+                    data = await subscriber.next()
+                except Exception as exc:
+                    yield f"event: error\ndata: {json.dumps(str(exc))}\n\n"
+                    return
+                payload = {
+                    "frequency": data.frequencies.tolist(),
+                    "s11_re": data.s11.real.tolist(),
+                    "s11_im": data.s11.imag.tolist(),
+                    "s21_re": data.s21.real.tolist(),
+                    "s21_im": data.s21.imag.tolist(),
+                }
+                yield f"event: sweep\ndata: {json.dumps(payload)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 @app.get("/metrics")
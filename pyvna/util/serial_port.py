@@ -1,8 +1,11 @@
 """Serial port abstractions used by the PyVNA drivers."""
 from __future__ import annotations
 
+import os
+import select
+import time
 from dataclasses import dataclass
-from typing import Protocol, runtime_checkable
+from typing import Optional, Protocol, runtime_checkable
 
 try:
     import serial  # type: ignore[import]
@@ -16,8 +19,12 @@ class SerialPortInterface(Protocol):
 
     def read(self, size: int) -> bytes: ...
 
+    def readinto(self, buffer: bytearray | memoryview) -> int: ...
+
     def readline(self) -> bytes: ...
 
+    def read_until(self, terminator: bytes) -> bytes: ...
+
     def write(self, data: bytes) -> int: ...
 
     def close(self) -> None: ...
@@ -34,12 +41,57 @@ class SerialPort:
     def read(self, size: int) -> bytes:
         return self._serial.read(size)
 
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        """Read up to ``len(buffer)`` bytes straight into ``buffer``.
+
+        On POSIX the bytes go from the file descriptor into ``buffer`` with
+        ``os.readv``; pyserial's own ``readinto`` reads into a fresh ``bytes``
+        object and copies it.  Returns 0 when the read timeout expires.
+        """
+        fd = self._fileno()
+        if fd is None:
+            return self._serial.readinto(buffer) or 0
+        view = memoryview(buffer).cast("B")
+        if not len(view):
+            return 0
+        timeout = self._serial.timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return 0
+            try:
+                count = os.readv(fd, [view])
+            except BlockingIOError:
+                continue
+            if count == 0:
+                raise OSError("device reports readiness to read but returned no data")
+            return count
+
     def readline(self) -> bytes:
         return self._serial.readline()
 
+    def read_until(self, terminator: bytes) -> bytes:
+        """Read until ``terminator`` or a timeout, draining whole OS buffers at once."""
+
+        buf = bytearray()
+        while not buf.endswith(terminator):
+            chunk = self._serial.read(max(1, self._serial.in_waiting))
+            if not chunk:
+                break
+            buf.extend(chunk)
+        return bytes(buf)
+
     def write(self, data: bytes) -> int:
         return self._serial.write(data)
 
+    def _fileno(self) -> Optional[int]:
+        if os.name != "posix":
+            return None
+        fileno = getattr(self._serial, "fileno", None)
+        return None if fileno is None else fileno()
+
     def close(self) -> None:
         self._serial.close()
 
@@ -47,6 +99,30 @@ class SerialPort:
         self._serial.timeout = timeout
 
 
+def usb_ids(path: str, sysfs_root: str = "/sys/class/tty") -> Optional[tuple[int, int]]:
+    """Return the USB ``(vendor, product)`` IDs behind a ``/dev/tty*`` path.
+
+    Looks the device up in sysfs; returns ``None`` for non-USB ports and on
+    platforms without sysfs.
+    """
+
+    name = os.path.basename(os.path.realpath(path))
+    if not name.startswith("tty"):
+        return None
+    node = os.path.join(sysfs_root, name, "device")
+    if not os.path.exists(node):
+        return None
+    node = os.path.realpath(node)
+    # The tty hangs off a USB interface; the IDs live on the parent device.
+    for _ in range(4):
+        try:
+            with open(os.path.join(node, "idVendor")) as vendor, open(os.path.join(node, "idProduct")) as product:
+                return int(vendor.read().strip(), 16), int(product.read().strip(), 16)
+        except (OSError, ValueError):
+            node = os.path.dirname(node)
+    return None
+
+
 def open_port(path: str, baudrate: int = 115200) -> SerialPortInterface:
     """Open a serial port returning a :class:`SerialPortInterface` instance."""
 
@@ -56,4 +132,4 @@ def open_port(path: str, baudrate: int = 115200) -> SerialPortInterface:
     return SerialPort(ser)
 
 
-__all__ = ["SerialPortInterface", "SerialPort", "open_port"]
+__all__ = ["SerialPortInterface", "SerialPort", "open_port", "usb_ids"]
@@ -1,9 +1,13 @@
 """High level VNA façade mirroring the Go implementation."""
 from __future__ import annotations
 
+import queue
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from threading import Event, RLock
-from typing import Optional, TYPE_CHECKING
+from threading import Condition, Event, Lock, RLock, Thread, current_thread
+from typing import Dict, Hashable, Iterator, Optional, TYPE_CHECKING
 
 from .calibration import (
     CalibrationErrorTerms,
@@ -14,12 +18,64 @@ from .calibration import (
     CalibrationMethod,
     compute_error_terms,
 )
-from .models import SweepConfig, VNAData
+from .models import SweepBlock, SweepConfig, VNAData, block_view
 
 if TYPE_CHECKING:  # pragma: no cover - only used for type checking
     from .driver import Driver
 
 
+@dataclass
+class CacheStats:
+    """Hit/miss counters of the per-device sweep cache."""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+ACQUISITION_WAIT_TIMEOUT = 5.0
+
+# Queued by the block producer of :meth:`VNA.iter_data` after the last block.
+_END_OF_SWEEP = object()
+
+
+class _FrameSlot:
+    """Newest completed sweep, published by one writer to many readers.
+
+    Each sweep arrives freshly allocated from the driver or the calibration,
+    so publishing only swaps a reference; readers share the published
+    :class:`VNAData` and must treat it as read-only.
+    """
+
+    def __init__(self) -> None:
+        self._frame: Optional[VNAData] = None
+        self._key: Hashable = None
+        self._stopped = False
+        self._cond = Condition()
+
+    def publish(self, key: Hashable, frame: VNAData) -> None:
+        with self._cond:
+            self._frame = frame
+            self._key = key
+            self._cond.notify_all()
+
+    def read(self, key: Hashable, timeout: float) -> Optional[VNAData]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._key == key or self._stopped, timeout)
+            if self._stopped or self._key != key:
+                return None
+            return self._frame
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+
 class VNA:
     """Represents a single VNA device bound to a concrete driver."""
 
@@ -27,27 +83,264 @@ class VNA:
         self._driver = driver
         self._lock = RLock()
         self._calibration: Optional[CalibrationProfile] = None
+        # Bumped whenever the calibration changes; part of the coalescing key.
+        self._calibration_version = 0
         self._closed = False
+        self._inflight: Dict[Hashable, Future[VNAData]] = {}
+        self._inflight_lock = Lock()
+        self._sweep: Optional[SweepConfig] = None
+        # Last acquired sweep as (key, monotonic start time, data).
+        self._cached: Optional[tuple[Hashable, float, VNAData]] = None
+        self._cache_stats = CacheStats()
+        self._acquisition: Optional[Thread] = None
+        self._acquisition_stop = Event()
+        self._acquisition_error: Optional[BaseException] = None
+        self._frames = _FrameSlot()
 
     def set_sweep(self, config: SweepConfig) -> None:
-        if config.start >= config.stop or config.points <= 0:
-            raise ValueError("invalid sweep parameters")
+        """Program ``config``; a no-op if the device is already set to it."""
+
+        _validate_sweep(config)
+        # Checked before locking so background acquisition never blocks readers
+        # that merely restate the current sweep.
+        if _sweep_key(config) == _sweep_key(self._sweep):
+            return
         with self._lock:
-            self._driver.set_sweep(config)
+            self._program_sweep(config)
+
+    def _program_sweep(self, config: SweepConfig) -> None:
+        if _sweep_key(config) == _sweep_key(self._sweep):
+            return
+        self._driver.set_sweep(config)
+        self._sweep = SweepConfig(start=config.start, stop=config.stop, points=config.points)
+
+    @property
+    def calibration_version(self) -> int:
+        """Counter bumped whenever the loaded calibration changes."""
+
+        return self._calibration_version
+
+    def cache_stats(self) -> CacheStats:
+        with self._inflight_lock:
+            return CacheStats(hits=self._cache_stats.hits, misses=self._cache_stats.misses)
+
+    def get_data(self, sweep: Optional[SweepConfig] = None, max_age: Optional[float] = None) -> VNAData:
+        """Acquire one sweep, programming ``sweep`` first when given.
+
+        With ``max_age`` (seconds), the last sweep is returned without touching
+        the hardware if it was taken with the same sweep and calibration and
+        is no older than that.  Concurrent calls asking for the same sweep
+        under the same calibration share a single hardware acquisition.  In
+        both cases callers receive a shared :class:`VNAData` and must treat it
+        as read-only.
+        """
+        if sweep is not None:
+            _validate_sweep(sweep)
+        if self._acquisition is not None:
+            return self._latest_frame(sweep)
+        key = (_sweep_key(sweep if sweep is not None else self._sweep), self._calibration_version)
+        with self._inflight_lock:
+            if max_age is not None:
+                cached = self._cached
+                if cached is not None and cached[0] == key and time.monotonic() - cached[1] <= max_age:
+                    self._cache_stats.hits += 1
+                    return cached[2]
+                self._cache_stats.misses += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+
+        started = time.monotonic()
+        try:
+            acquired_key, data = self._acquire(sweep)
+        except BaseException as exc:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            future.set_exception(exc)
+            raise
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+            # ``key`` was computed unlocked and may predate a sweep or
+            # calibration change; cache under what was actually used.
+            self._cached = (acquired_key, started, data)
+        future.set_result(data)
+        return data
+
+    def _acquire(self, sweep: Optional[SweepConfig]) -> tuple[Hashable, VNAData]:
+        """Scan once and return the data with the key of the configuration used."""
 
-    def get_data(self) -> VNAData:
         with self._lock:
+            if self._closed:
+                raise RuntimeError("device is closed")
+            if sweep is not None:
+                self._program_sweep(sweep)
             data = self._driver.scan()
+            key = (_sweep_key(self._sweep), self._calibration_version)
             calibration = self._calibration
         if calibration is None:
-            return data
-        return calibration.apply(data)
+            return key, data
+        return key, calibration.apply(data)
+
+    def start_acquisition(self) -> None:
+        """Sweep continuously in a background thread.
+
+        While running, :meth:`get_data` returns the newest completed sweep,
+        shared and read-only, without waiting for the device.  Sweeps taken before a sweep or
+        calibration change are never returned after it.  If a sweep fails the
+        loop stops: readers waiting on it get the error and later calls go to
+        the device directly.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("device is closed")
+            if self._acquisition is not None:
+                return
+            self._acquisition_stop.clear()
+            self._acquisition_error = None
+            self._frames = _FrameSlot()
+            self._acquisition = Thread(
+                target=self._acquisition_loop,
+                args=(self._acquisition_stop, self._frames),
+                name="pyvna-acquisition",
+                daemon=True,
+            )
+            self._acquisition.start()
+
+    def stop_acquisition(self) -> None:
+        thread = self._acquisition
+        if thread is None:
+            return
+        self._acquisition_stop.set()
+        thread.join()
+        self._frames.stop()
+        self._acquisition = None
+
+    def _acquisition_loop(self, stop: Event, frames: _FrameSlot) -> None:
+        try:
+            while not stop.is_set():
+                with self._lock:
+                    if self._closed:
+                        break
+                    raw = self._driver.scan()
+                    calibration = self._calibration
+                    key = (_sweep_key(self._sweep), self._calibration_version)
+                frames.publish(key, raw if calibration is None else calibration.apply(raw))
+        except Exception as exc:
+            self._acquisition_error = exc
+        finally:
+            # Never serve frames from a loop that has stopped, and fall back to
+            # direct acquisition if it stopped on its own.
+            frames.stop()
+            if self._acquisition is current_thread():
+                self._acquisition = None
+
+    def _latest_frame(self, sweep: Optional[SweepConfig]) -> VNAData:
+        if sweep is not None:
+            self.set_sweep(sweep)
+        key = (_sweep_key(self._sweep), self._calibration_version)
+        data = self._frames.read(key, ACQUISITION_WAIT_TIMEOUT)
+        error = self._acquisition_error
+        if error is not None:
+            raise RuntimeError(f"acquisition stopped: {error}") from error
+        if data is None:
+            raise RuntimeError("no sweep acquired for the current configuration")
+        return data
+
+    def iter_data(self) -> Iterator[SweepBlock]:
+        """Yield calibrated blocks of one sweep as the driver decodes them.
+
+        A helper thread holds the device lock for exactly the duration of the
+        sweep and hands blocks over through a queue, so the generator may be
+        resumed from any thread, and abandoning it never leaves the device
+        locked.  Drivers without ``scan_blocks`` deliver the whole sweep as
+        one block.
+        """
+        blocks: "queue.SimpleQueue[object]" = queue.SimpleQueue()
+        Thread(target=self._produce_blocks, args=(blocks,), name="pyvna-blocks", daemon=True).start()
+        while True:
+            item = blocks.get()
+            if item is _END_OF_SWEEP:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item  # type: ignore[misc]
+
+    def _produce_blocks(self, out: "queue.SimpleQueue[object]") -> None:
+        try:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("device is closed")
+                calibration = self._calibration
+                scan_blocks = getattr(self._driver, "scan_blocks", None)
+                if scan_blocks is None:
+                    raw = self._driver.scan()
+                    blocks: Iterator[SweepBlock] = iter([block_view(raw, 0, len(raw))])
+                else:
+                    blocks = scan_blocks()
+                sweep: Optional[VNAData] = None
+                for block in blocks:
+                    if calibration is None:
+                        out.put(block)
+                        continue
+                    if sweep is None:
+                        sweep = VNAData.allocate(len(block.sweep))
+                    corrected = calibration.apply_range(block.data, block.offset)
+                    sweep.frequencies[block.offset : block.end] = corrected.frequencies
+                    sweep.s11[block.offset : block.end] = corrected.s11
+                    sweep.s21[block.offset : block.end] = corrected.s21
+                    out.put(block_view(sweep, block.offset, block.end))
+        except BaseException as exc:
+            out.put(exc)
+        else:
+            out.put(_END_OF_SWEEP)
+
+    def start_streaming(self, depth: int = 4) -> None:
+        """Switch the driver to continuous acquisition if it supports it.
+
+        While streaming, :meth:`get_data` returns the newest complete sweep
+        held by the driver instead of triggering a new one.
+        """
+        with self._lock:
+            start = getattr(self._driver, "start_streaming", None)
+            if start is None:
+                raise RuntimeError("driver does not support continuous streaming")
+            start(depth)
+
+    def stop_streaming(self) -> None:
+        with self._lock:
+            stop = getattr(self._driver, "stop_streaming", None)
+            if stop is not None:
+                stop()
+
+    def probe(self) -> bool:
+        """Cheap liveness check; raises if the device stopped answering.
+
+        Returns ``False`` without touching the port when the device is busy
+        (a scan in progress or continuous streaming), which proves it alive.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._closed:
+                raise RuntimeError("device is closed")
+            if getattr(self._driver, "streaming", False):
+                return False
+            self._driver.identify()
+            return True
+        finally:
+            self._lock.release()
 
     def close(self) -> None:
+        self.stop_acquisition()
         with self._lock:
             if self._closed:
                 return
             self._closed = True
+            self._cached = None
             self._driver.close()
 
     def load_calibration(self, profile: CalibrationProfile) -> None:
@@ -56,10 +349,12 @@ class VNA:
         profile.validate()
         with self._lock:
             self._calibration = profile
+            self._calibration_version += 1
 
     def clear_calibration(self) -> None:
         with self._lock:
             self._calibration = None
+            self._calibration_version += 1
 
     def apply_calibration(self, data: VNAData) -> VNAData:
         with self._lock:
@@ -73,9 +368,12 @@ class VNA:
         plan: CalibrationPlan,
         prompt: Optional[CalibrationPrompt] = None,
         cancel_event: Optional[Event] = None,
+        averages: int = 1,
     ) -> CalibrationProfile:
         if not plan.steps:
             raise ValueError("calibration plan does not contain steps")
+        if averages < 1:
+            raise ValueError("averages must be at least 1")
         if plan.sweep.points <= 0 or plan.sweep.start >= plan.sweep.stop:
             raise ValueError("invalid sweep parameters in calibration plan")
 
@@ -96,18 +394,15 @@ class VNA:
                 raise TimeoutError("calibration cancelled")
             if prompt is not None:
                 prompt(step.standard)
-            measurement = self._scan_once()
-            profile.standards[step.standard] = CalibrationMeasurement(
-                frequencies=list(measurement.frequencies),
-                s11=list(measurement.s11),
-                s21=list(measurement.s21),
-            )
+            sweeps = [self._scan_once() for _ in range(averages)]
+            profile.standards[step.standard] = CalibrationMeasurement.from_sweeps(sweeps)
 
         compute_error_terms(profile)
         profile.validate()
 
         with self._lock:
             self._calibration = profile
+            self._calibration_version += 1
         return profile
 
     def _scan_once(self) -> VNAData:
@@ -115,4 +410,15 @@ class VNA:
             return self._driver.scan()
 
 
-__all__ = ["VNA", "SweepConfig", "VNAData"]
+def _validate_sweep(config: SweepConfig) -> None:
+    if config.start >= config.stop or config.points <= 0:
+        raise ValueError("invalid sweep parameters")
+
+
+def _sweep_key(config: Optional[SweepConfig]) -> Hashable:
+    if config is None:
+        return None
+    return (float(config.start), float(config.stop), int(config.points))
+
+
+__all__ = ["VNA", "CacheStats", "SweepConfig", "VNAData"]
@@ -1,21 +1,47 @@
 from __future__ import annotations
 
+import asyncio
+import io
+import json
+import os
+import pty
 import struct
 import threading
+import time
+import tracemalloc
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
+import numpy as np
 import pytest
+from fastapi import HTTPException, WebSocketDisconnect
+from fastapi.testclient import TestClient
 
-from pyvna.driver import driver_factory
+from pyvna import formats
+from pyvna.driver import DetectionCache, DeviceState, DeviceUnavailableError, VNAPool, driver_factory
 from pyvna.driver_v1 import V1Driver
-from pyvna.driver_v2 import V2Driver, OP_READ, ADDR_DEVICE_VARIANT
+from pyvna.driver_v2 import (
+    ADDR_DEVICE_VARIANT,
+    OP_READ,
+    OP_READFIFO,
+    SweepRingBuffer,
+    V2Driver,
+    decode_fifo_records,
+)
 from pyvna.models import SweepConfig, VNAData
+from pyvna.server import main
+from pyvna.util.serial_port import SerialPort, usb_ids
 from pyvna.vna import VNA
 from pyvna.calibration import (
+    CalibrationErrorTerms,
+    CalibrationMeasurement,
     CalibrationPlan,
+    CalibrationProfile,
     CalibrationMethod,
     CalibrationStep,
     CalibrationStandard,
+    compute_error_terms,
 )
 
 
@@ -35,6 +61,11 @@ class MockSerialPort:
                 size -= 1
             return bytes(data)
 
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
     def readline(self) -> bytes:
         with self._lock:
             data = bytearray()
@@ -45,6 +76,13 @@ class MockSerialPort:
                     break
             return bytes(data)
 
+    def read_until(self, terminator: bytes) -> bytes:
+        with self._lock:
+            data = bytearray()
+            while self._read_buffer and not data.endswith(terminator):
+                data.append(self._read_buffer.popleft())
+            return bytes(data)
+
     def write(self, data: bytes) -> int:
         with self._lock:
             self._write_buffer.extend(data)
@@ -87,6 +125,43 @@ def test_driver_factory_selects_v2() -> None:
     assert isinstance(driver, V2Driver)
 
 
+def test_usb_ids_reads_sysfs(tmp_path) -> None:
+    usb_device = tmp_path / "devices" / "usb1" / "1-1"
+    interface = usb_device / "1-1:1.0"
+    interface.mkdir(parents=True)
+    (usb_device / "idVendor").write_text("04b4\n")
+    (usb_device / "idProduct").write_text("0008\n")
+    tty = tmp_path / "class" / "ttyACM0"
+    tty.mkdir(parents=True)
+    (tty / "device").symlink_to(interface)
+
+    assert usb_ids("/dev/ttyACM0", sysfs_root=str(tmp_path / "class")) == (0x04B4, 0x0008)
+    assert usb_ids("/dev/ttyS9", sysfs_root=str(tmp_path / "class")) is None
+
+
+def test_driver_factory_uses_usb_hint_and_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("pyvna.driver.usb_ids", lambda path: (0x04B4, 0x0008))
+    cache = DetectionCache()
+    mock = MockSerialPort()
+    mock.variant = 0x04
+    driver = driver_factory(mock, "/dev/ttyACM0", cache=cache)
+    assert isinstance(driver, V2Driver)
+    assert b"version" not in mock._write_buffer
+    assert cache.get("/dev/ttyACM0") == "v2"
+
+    # A cached family is probed first even when the USB IDs are unknown.
+    monkeypatch.setattr("pyvna.driver.usb_ids", lambda path: None)
+    mock = MockSerialPort()
+    mock.variant = 0x02
+    assert isinstance(driver_factory(mock, "/dev/ttyACM0", cache=cache), V2Driver)
+    assert b"version" not in mock._write_buffer
+
+    mock = MockSerialPort()
+    with pytest.raises(RuntimeError):
+        driver_factory(mock, "/dev/ttyACM0", cache=cache)
+    assert cache.get("/dev/ttyACM0") is None
+
+
 def test_v1driver_scan() -> None:
     mock = MockSerialPort()
     driver = V1Driver(mock)
@@ -113,6 +188,122 @@ def test_v1driver_scan_invalid_data() -> None:
         driver.scan()
 
 
+@pytest.mark.parametrize("bulk_read", [True, False])
+def test_v1driver_scan_skips_echo_and_prompt(bulk_read: bool) -> None:
+    mock = MockSerialPort()
+    driver = V1Driver(mock, bulk_read=bulk_read)
+    driver.set_sweep(SweepConfig(start=1e6, stop=2e6, points=2))
+    mock.set_read_data(
+        b"sweep 1000000 2000000 2\r\nch> data\r\n"
+        b"1000000 0.5 -0.5 0.1 -0.1\r\n2000000 0.25 0.25 0.2 -0.2\r\nch> "
+    )
+    data = driver.scan()
+    assert list(data.frequencies) == [1e6, 2e6]
+    assert data.s11[1] == complex(0.25, 0.25)
+    assert mock.timeout is None
+
+
+@pytest.mark.parametrize("bulk_read", [True, False])
+def test_v1driver_scan_stops_at_prompt(bulk_read: bool) -> None:
+    mock = MockSerialPort()
+    driver = V1Driver(mock, response_timeout=30.0, bulk_read=bulk_read)
+    driver.set_sweep(SweepConfig(start=1e6, stop=2e6, points=2))
+    mock.set_read_data(b"data\r\n1000000 0.5 -0.5 0.1 -0.1\r\nch> ")
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="received 1"):
+        driver.scan()
+    assert time.monotonic() - started < 1.0
+
+
+def test_v1driver_bulk_parse_reports_line_number() -> None:
+    mock = MockSerialPort()
+    driver = V1Driver(mock)
+    driver.set_sweep(SweepConfig(start=1e6, stop=3e6, points=3))
+    rows = [f"{freq} 0.5 -0.5 0.1 -0.1" for freq in (1000000, 2000000)] + ["3000000 0.5 -0.5 0.1"]
+    mock.set_read_data(("\r\n".join(["data", *rows]) + "\r\nch> ").encode())
+    with pytest.raises(ValueError, match="line 3 contained 4 values"):
+        driver.scan()
+
+
+class ScanShellPort(MockSerialPort):
+    """Answers ``scan start stop points outmask`` like the V1 firmware shell.
+
+    ``binary`` selects how the 0x80 outmask bit is handled: ``"supported"``
+    replies in binary, ``"ignored"`` prints text anyway and ``"rejected"``
+    prints a usage error.
+    """
+
+    def __init__(self, binary: str = "supported") -> None:
+        super().__init__()
+        self.commands: list[str] = []
+        self.binary = binary
+
+    def write(self, data: bytes) -> int:
+        command = bytes(data).decode().strip()
+        self.commands.append(command)
+        parts = command.split()
+        wants_binary = parts[0] == "scan" and len(parts) > 4 and int(parts[4]) & 0x80
+        if wants_binary and self.binary == "rejected":
+            self.set_read_data(f"{command}\r\nusage: scan {{start(Hz)}} {{stop(Hz)}} [points] [outmask]\r\nch> ".encode())
+            return len(data)
+        lines = [command]
+        binary = bytearray()
+        if parts[0] == "scan":
+            start, stop, points = int(parts[1]), int(parts[2]), int(parts[3])
+            binary.extend(struct.pack("<HH", 0x87, points))
+            for idx in range(points):
+                freq = start + (stop - start) * idx // max(points - 1, 1)
+                lines.append(f"{freq} {idx * 1e-3:.6f} 0.5 0.25 {-idx * 1e-3:.6f}")
+                binary.extend(struct.pack("<I4f", freq, idx * 1e-3, 0.5, 0.25, -idx * 1e-3))
+        if wants_binary and self.binary == "supported":
+            self.set_read_data(f"{command}\r\n".encode() + bytes(binary) + b"ch> ")
+        else:
+            self.set_read_data(("\r\n".join(lines) + "\r\nch> ").encode())
+        return len(data)
+
+
+@pytest.mark.parametrize("bulk_read", [True, False])
+def test_v1driver_scan_command_segments_large_sweeps(bulk_read: bool) -> None:
+    port = ScanShellPort()
+    driver = V1Driver(port, bulk_read=bulk_read)
+    config = SweepConfig(start=1e6, stop=250e6, points=250)
+    driver.set_sweep(config)
+    assert port.commands == []
+
+    segments = driver.segments()
+    assert [segment.points for segment in segments] == [84, 83, 83]
+
+    data = driver.scan()
+    assert port.commands[0] == "scan 1000000 84000000 84 7"
+    assert len(port.commands) == 3
+    assert len(data) == 250
+    assert list(data.frequencies) == pytest.approx(list(np.linspace(1e6, 250e6, 250)))
+    assert data.s11[84] == pytest.approx(complex(0.0, 0.5))
+    assert data.s21[249] == pytest.approx(complex(0.25, -0.082))
+
+
+@pytest.mark.parametrize("binary", ["supported", "ignored", "rejected"])
+def test_v1driver_binary_scan_with_text_fallback(binary: str) -> None:
+    port = ScanShellPort(binary=binary)
+    driver = V1Driver(port, binary_scan=True)
+    driver.set_sweep(SweepConfig(start=1e6, stop=250e6, points=250))
+
+    data = driver.scan()
+    assert len(data) == 250
+    assert list(data.frequencies) == pytest.approx(list(np.linspace(1e6, 250e6, 250)))
+    assert data.s11[83] == pytest.approx(complex(0.083, 0.5))
+    assert data.s21[249] == pytest.approx(complex(0.25, -0.082))
+    assert driver.binary_scan is (binary == "supported")
+    masks = [int(command.split()[4]) for command in port.commands]
+    if binary == "supported":
+        assert masks == [0x87, 0x87, 0x87]
+    elif binary == "ignored":
+        # The text reply to the binary request is used; later segments are plain text.
+        assert masks == [0x87, 7, 7]
+    else:
+        assert masks == [0x87, 7, 7, 7]
+
+
 def test_v2driver_scan() -> None:
     mock = MockSerialPort()
     driver = V2Driver(mock)
@@ -131,6 +322,216 @@ def test_v2driver_scan() -> None:
     assert data.frequencies[0] == pytest.approx(1e6)
 
 
+def test_v2driver_set_sweep_coalesces_register_writes() -> None:
+    mock = MockSerialPort()
+    writes: list[bytes] = []
+    original_write = mock.write
+
+    def recording_write(data: bytes) -> int:
+        writes.append(bytes(data))
+        return original_write(data)
+
+    mock.write = recording_write  # type: ignore[method-assign]
+    driver = V2Driver(mock)
+    writes.clear()
+
+    driver.set_sweep(SweepConfig(start=1e6, stop=2e6, points=101))
+    assert len(writes) == 1
+    assert len(writes[0]) == 10 + 10 + 4
+
+    driver.set_sweep(SweepConfig(start=1e6, stop=2e6, points=101))
+    assert len(writes) == 1
+
+    driver.set_sweep(SweepConfig(start=1e6, stop=3e6, points=101))
+    assert len(writes) == 2
+    assert len(writes[1]) == 10
+    assert struct.unpack_from("<d", writes[1], 2)[0] == pytest.approx(2e4)
+
+    driver.invalidate_registers()
+    driver.set_sweep(SweepConfig(start=1e6, stop=3e6, points=101))
+    assert len(writes[2]) == 24
+
+
+def fifo_records(indices: list[int], sweep: int = 0) -> bytes:
+    payload = bytearray()
+    for idx in indices:
+        payload.extend(struct.pack("<6fH6x", float(sweep), float(idx), 0.0, 0.0, 0.5, 0.0, idx))
+    return bytes(payload)
+
+
+def test_sweep_ring_buffer_assembles_complete_sweeps() -> None:
+    ring = SweepRingBuffer(points=4, depth=2)
+    # Stream joins mid-sweep: the partial sweep must not be published.
+    ring.push(decode_fifo_records(fifo_records([2, 3], sweep=0) + fifo_records([0, 1], sweep=1)))
+    assert ring.sequence == 0
+    assert ring.latest(timeout=0) is None
+
+    ring.push(decode_fifo_records(fifo_records([2, 3], sweep=1) + fifo_records([0], sweep=2)))
+    assert ring.sequence == 1
+    latest = ring.latest(timeout=0)
+    assert list(latest["freq_index"]) == [0, 1, 2, 3]
+    assert set(latest["fwd0_re"]) == {1.0}
+
+    ring.push(decode_fifo_records(fifo_records([1, 2, 3], sweep=2)))
+    assert ring.sequence == 2
+    assert set(ring.latest(timeout=0)["fwd0_re"]) == {2.0}
+
+
+class StreamingFifoPort(MockSerialPort):
+    """Emits FIFO records for every OP_READFIFO request, like a free-running V2."""
+
+    def __init__(self, points: int) -> None:
+        super().__init__()
+        self.points = points
+        self._next_index = points // 2
+
+    def write(self, data: bytes) -> int:
+        if len(data) == 3 and data[0] == OP_READFIFO:
+            indices = []
+            for _ in range(data[2]):
+                indices.append(self._next_index)
+                self._next_index = (self._next_index + 1) % self.points
+            self.set_read_data(fifo_records(indices))
+        return super().write(data)
+
+
+def test_v2driver_streaming_returns_latest_sweep() -> None:
+    port = StreamingFifoPort(points=8)
+    driver = V2Driver(port)
+    driver.set_sweep(SweepConfig(start=1e6, stop=8e6, points=8))
+    vna = VNA(driver)
+    vna.start_streaming(depth=3)
+    try:
+        assert driver.streaming
+        data = vna.get_data()
+        assert len(data) == 8
+        assert list(data.frequencies) == pytest.approx([1e6 * (idx + 1) for idx in range(8)])
+        assert list(data.s11.imag) == pytest.approx(list(range(8)))
+        assert data.s21[0] == pytest.approx(0.5)
+    finally:
+        vna.close()
+    assert not driver.streaming
+    assert port.timeout is None
+
+
+def test_v2driver_scan_blocks_yields_progressively() -> None:
+    mock = MockSerialPort()
+    driver = V2Driver(mock)
+    driver.set_sweep(SweepConfig(start=1e6, stop=10e6, points=10))
+    mock.set_read_data(fifo_records(list(range(10))))
+
+    blocks = list(driver.scan_blocks(block_points=4))
+    assert [(block.offset, block.end) for block in blocks] == [(0, 4), (4, 8), (8, 10)]
+    assert blocks[-1].complete
+    assert np.shares_memory(blocks[0].data.s11, blocks[-1].sweep.s11)
+    assert list(blocks[-1].sweep.s11.imag) == pytest.approx(list(range(10)))
+
+    # Abandoning the generator drains the rest of the response.
+    mock.set_read_data(fifo_records(list(range(10))) + b"\x02")
+    partial = driver.scan_blocks(block_points=4)
+    first = next(partial)
+    assert first.data.frequencies[0] == pytest.approx(1e6)
+    partial.close()
+    assert mock.read(1) == b"\x02"
+
+
+def test_vna_iter_data_applies_calibration_per_block() -> None:
+    port = ScanShellPort()
+    driver = V1Driver(port, max_segment_points=4)
+    vna = VNA(driver)
+    vna.set_sweep(SweepConfig(start=1e6, stop=10e6, points=10))
+    freq = np.linspace(1e6, 10e6, 10)
+    profile = _profile_for(
+        freq,
+        CalibrationErrorTerms(
+            directivity=np.zeros(10, dtype=complex),
+            source_match=np.full(10, 2 + 0j),
+            reflection_tracking=np.zeros(10, dtype=complex),
+        ),
+    )
+    placeholder = CalibrationMeasurement(frequencies=freq, s11=np.zeros(10), s21=np.zeros(10))
+    profile.standards = {
+        standard: placeholder
+        for standard in (CalibrationStandard.OPEN, CalibrationStandard.SHORT, CalibrationStandard.LOAD)
+    }
+    vna.load_calibration(profile)
+
+    blocks = list(vna.iter_data())
+    assert [block.offset for block in blocks] == [0, 4, 7]
+    assert blocks[-1].sweep.s11[9] == pytest.approx(complex(0.001, 0.25))
+    assert blocks[-1].sweep.s21[9] == pytest.approx(complex(0.25, -0.002))
+
+    # Resuming from another thread works, and abandoning the generator does
+    # not leave the device locked.
+    iterator = vna.iter_data()
+    first = next(iterator)
+    rest: list = []
+    worker = threading.Thread(target=lambda: rest.extend(iterator))
+    worker.start()
+    worker.join(5)
+    assert [block.offset for block in [first, *rest]] == [0, 4, 7]
+    abandoned = vna.iter_data()
+    next(abandoned)
+    assert len(vna.get_data()) == 10
+
+
+class RegisterV2Port(MockSerialPort):
+    """Decodes V2 register writes and answers FIFO reads for the programmed sweep."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.registers: dict[int, float] = {}
+        self.writes = 0
+        self.sweeps: list[tuple[float, int]] = []
+
+    def write(self, data: bytes) -> int:
+        self.writes += 1
+        data = bytes(data)
+        pos = 0
+        while pos < len(data):
+            op = data[pos]
+            if op == 0x24:
+                self.registers[data[pos + 1]] = struct.unpack_from("<d", data, pos + 2)[0]
+                pos += 10
+            elif op == 0x21:
+                self.registers[data[pos + 1]] = struct.unpack_from("<H", data, pos + 2)[0]
+                pos += 4
+            elif op == OP_READFIFO:
+                start, step, points = self.registers[0x00], self.registers[0x10], int(self.registers[0x20])
+                self.sweeps.append((start, points))
+                payload = bytearray()
+                for idx in range(points):
+                    freq = start + step * idx
+                    payload.extend(struct.pack("<6fH6x", 0.0, freq / 1e9, 0.0, 0.0, 0.0, 0.0, idx))
+                self.set_read_data(bytes(payload))
+                pos += 3
+            else:
+                pos += 1
+        return len(data)
+
+
+def test_v2driver_segments_large_sweeps() -> None:
+    port = RegisterV2Port()
+    driver = V2Driver(port, max_segment_points=100)
+    driver.set_sweep(SweepConfig(start=1e6, stop=250e6, points=250))
+    assert driver.segmented
+    port.writes = 0
+
+    data = driver.scan()
+    assert port.writes == 3
+    assert [points for _, points in port.sweeps] == [84, 83, 83]
+    assert port.sweeps[1][0] == pytest.approx(85e6)
+    assert len(data) == 250
+    assert list(data.frequencies) == pytest.approx(list(np.linspace(1e6, 250e6, 250)))
+    assert list(data.s11.imag) == pytest.approx(list(data.frequencies / 1e9), rel=1e-6)
+
+    # Stopping after the first block must not leave the prefetched segment unread.
+    blocks = driver.scan_blocks()
+    assert next(blocks).end == 84
+    blocks.close()
+    assert port.read(1) == b""
+
+
 def test_v2driver_scan_unexpected_eof() -> None:
     mock = MockSerialPort()
     driver = V2Driver(mock)
@@ -157,6 +558,102 @@ def test_v2driver_parse_binary_data_validation() -> None:
         driver._parse_binary_data(b"\x00" * 32)
 
 
+def test_v2_decode_fifo_records_exposes_all_fields() -> None:
+    payload = bytearray()
+    for idx in range(3):
+        payload.extend(struct.pack("<6fH6x", 0.5 * idx, -0.5, 1.0, 2.0, 0.1 * idx, -0.1, idx))
+    records = decode_fifo_records(payload)
+    assert records.dtype.itemsize == 32
+    assert list(records["freq_index"]) == [0, 1, 2]
+    assert records["rev0_im"][1] == pytest.approx(2.0)
+    assert np.shares_memory(records, np.frombuffer(payload, dtype=np.uint8))
+
+    driver = V2Driver(MockSerialPort())
+    driver.config = SweepConfig(start=1e6, stop=3e6, points=3)
+    data = driver._parse_binary_data(bytes(payload))
+    assert list(data.frequencies) == [1e6, 2e6, 3e6]
+    assert data.s11[2] == pytest.approx(complex(1.0, -0.5))
+    assert data.s21[1] == pytest.approx(complex(0.1, -0.1))
+
+
+class LoopbackPort(MockSerialPort):
+    """Serves the same payload forever without allocating per read."""
+
+    def __init__(self, payload: bytes) -> None:
+        super().__init__()
+        self._payload = memoryview(payload)
+        self._pos = 0
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        count = min(len(buffer), len(self._payload) - self._pos)
+        buffer[:count] = self._payload[self._pos : self._pos + count]
+        self._pos = (self._pos + count) % len(self._payload)
+        return count
+
+
+def test_v2driver_receive_path_does_not_allocate() -> None:
+    points = 1024
+    port = LoopbackPort(bytes(points * 32))
+    driver = V2Driver(port)
+    driver.set_sweep(SweepConfig(start=1e6, stop=900e6, points=points))
+    buffer_id = id(driver._rx_buffer)
+    driver._read_exact(points * 32)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(50):
+            driver._read_exact(points * 32)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert id(driver._rx_buffer) == buffer_id
+    assert after - before == 0
+    # A copying implementation would peak at several times the 32 KiB sweep.
+    assert peak - before < 1024
+
+
+def test_serial_port_readinto_fills_buffer_in_place() -> None:
+    serial = pytest.importorskip("serial")
+    master, slave = pty.openpty()
+    port = SerialPort(serial.Serial(os.ttyname(slave), timeout=0.5))
+    payload = bytes(range(256)) * 8
+    buffer = bytearray(len(payload))
+    view = memoryview(buffer)
+
+    def transfer() -> None:
+        os.write(master, payload)
+        received = 0
+        while received < len(payload):
+            count = port.readinto(view[received:])
+            assert count
+            received += count
+
+    try:
+        transfer()
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            for _ in range(20):
+                transfer()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert buffer == payload
+        # pyserial's readinto would allocate a 2 KiB bytes object per read.
+        assert peak - before < 1024
+
+        port.set_read_timeout(0.05)
+        assert port.readinto(view) == 0
+    finally:
+        port.close()
+        os.close(master)
+        os.close(slave)
+
+
 def test_vnadata_to_touchstone_precision() -> None:
     data = VNAData(
         frequencies=[1.23456789e6],
@@ -167,6 +664,25 @@ def test_vnadata_to_touchstone_precision() -> None:
     assert "1234567.890000" in touchstone
 
 
+def test_vnadata_array_storage() -> None:
+    data = VNAData(
+        frequencies=[1e6, 2e6, 3e6],
+        s11=[complex(0.5, 0), complex(0, 0), complex(1.0, 0)],
+        s21=[0j, 0j, 0j],
+    )
+    assert data.frequencies.dtype == np.float64
+    assert data.s11.dtype == np.complex128
+    assert len(data) == 3
+    assert data.s11[0] == complex(0.5, 0)
+
+    same = VNAData(frequencies=data.frequencies, s11=data.s11, s21=data.s21)
+    assert np.shares_memory(same.s11, data.s11)
+    assert same == data
+
+    vswr = data.calculate_vswr()
+    assert list(vswr) == pytest.approx([3.0, 1.0, 9999.0])
+
+
 class StubDriver:
     def __init__(self, sequence: list[VNAData]) -> None:
         self._sequence = sequence
@@ -251,3 +767,830 @@ def test_vna_apply_calibration_without_profile() -> None:
     with pytest.raises(ValueError):
         vna.apply_calibration(VNAData())
 
+
+
+def _profile_for(frequencies: np.ndarray, terms: CalibrationErrorTerms) -> CalibrationProfile:
+    return CalibrationProfile(
+        name="synthetic",
+        method=CalibrationMethod.SOL,
+        created_at=datetime.now(timezone.utc),
+        sweep=SweepConfig(start=frequencies[0], stop=frequencies[-1], points=len(frequencies)),
+        frequencies=frequencies,
+        standards={},
+        error_terms=terms,
+    )
+
+
+def test_calibration_apply_matches_scalar_reference() -> None:
+    rng = np.random.default_rng(7)
+    count = 1601
+    freq = np.linspace(1e6, 900e6, count)
+    terms = CalibrationErrorTerms(
+        directivity=rng.normal(size=count) + 1j * rng.normal(size=count),
+        source_match=rng.normal(size=count) + 1j * rng.normal(size=count),
+        reflection_tracking=rng.normal(size=count) + 1j * rng.normal(size=count),
+    )
+    measured = rng.normal(size=count) + 1j * rng.normal(size=count)
+    profile = _profile_for(freq, terms)
+
+    result = profile.apply(VNAData(frequencies=freq, s11=measured, s21=np.zeros(count)))
+
+    for idx in range(count):
+        e00 = complex(terms.directivity[idx])
+        e11 = complex(terms.source_match[idx])
+        tracking = complex(terms.reflection_tracking[idx])
+        meas = complex(measured[idx])
+        expected = (meas - e00) / (e11 + tracking * (meas - e00))
+        assert abs(result.s11[idx] - expected) <= 1e-12 * abs(expected)
+
+
+def test_calibration_apply_reports_all_zero_denominators() -> None:
+    freq = np.array([1e6, 2e6, 3e6])
+    terms = CalibrationErrorTerms(
+        directivity=np.zeros(3, dtype=complex),
+        source_match=np.array([0j, 1 + 0j, 0j]),
+        reflection_tracking=np.zeros(3, dtype=complex),
+    )
+    profile = _profile_for(freq, terms)
+    with pytest.raises(ZeroDivisionError, match="1000000.000 Hz, 3000000.000 Hz"):
+        profile.apply(VNAData(frequencies=freq, s11=np.ones(3), s21=np.zeros(3)))
+
+    with pytest.raises(ValueError):
+        profile.apply(VNAData(frequencies=freq + 1.0, s11=np.ones(3), s21=np.zeros(3)))
+
+
+def test_compute_error_terms_averages_repeated_sweeps() -> None:
+    freq = np.array([1e8, 2e8])
+    e00 = np.array([0.05 - 0.01j, 0.04 + 0.02j])
+    e11 = np.array([0.92 + 0.02j, 0.9 - 0.01j])
+    tracking = np.array([0.12 - 0.03j, 0.1 + 0.01j])
+    noise = np.array([[0.001, -0.002], [-0.001, 0.002]])
+
+    def standard(gamma: complex) -> CalibrationMeasurement:
+        clean = apply_three_term_error_model(e00, e11, tracking, gamma)
+        sweeps = [VNAData(frequencies=freq, s11=clean + offset, s21=np.zeros(2)) for offset in noise]
+        return CalibrationMeasurement.from_sweeps(sweeps)
+
+    profile = _profile_for(freq, CalibrationErrorTerms())
+    profile.standards = {
+        CalibrationStandard.OPEN: standard(1),
+        CalibrationStandard.SHORT: standard(-1),
+        CalibrationStandard.LOAD: standard(0),
+    }
+    assert profile.standards[CalibrationStandard.OPEN].sweeps == 2
+
+    compute_error_terms(profile)
+    profile.validate()
+    assert np.allclose(profile.error_terms.directivity, e00)
+
+    gamma = np.array([0.3 - 0.1j, -0.2 + 0.4j])
+    measured = apply_three_term_error_model(e00, e11, tracking, gamma)
+    corrected = profile.apply(VNAData(frequencies=freq, s11=measured, s21=np.zeros(2)))
+    assert np.allclose(corrected.s11, gamma)
+
+
+class GatedPool(VNAPool):
+    """Pool whose device opens block until the test releases them."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.gates: dict[str, threading.Event] = {}
+        self.opens: list[str] = []
+
+    def _open_device(self, port_path: str) -> VNA:
+        self.opens.append(port_path)
+        gate = self.gates.get(port_path)
+        if gate is not None:
+            assert gate.wait(5)
+        if port_path == "broken":
+            raise RuntimeError("failed to identify VNA device")
+        return VNA(StubDriver([]))
+
+
+def test_vnapool_opens_ports_concurrently() -> None:
+    pool = GatedPool()
+    pool.gates["slow"] = threading.Event()
+    results: list[VNA] = []
+
+    def open_slow() -> None:
+        results.append(pool.get("slow"))
+
+    waiters = [threading.Thread(target=open_slow) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    time.sleep(0.05)
+
+    # A slow open must not block other ports.
+    fast = pool.get("fast")
+    assert pool.get("fast") is fast
+
+    pool.gates["slow"].set()
+    for thread in waiters:
+        thread.join(5)
+    assert len(results) == 3
+    assert all(vna is results[0] for vna in results)
+    assert pool.opens.count("slow") == 1
+
+    with pytest.raises(RuntimeError):
+        pool.get("broken")
+    # Known-dead devices fail fast until the retry backoff has elapsed.
+    with pytest.raises(DeviceUnavailableError):
+        pool.get("broken")
+    assert pool.opens.count("broken") == 1
+    pool.close_all()
+
+
+class SleepyDriver(StubDriver):
+    def __init__(self, delay: float) -> None:
+        super().__init__([])
+        self.delay = delay
+
+    def scan(self) -> VNAData:
+        time.sleep(self.delay)
+        return VNAData(frequencies=[1e6], s11=[complex(self.delay, 0)], s21=[0j])
+
+
+class SleepyPool(VNAPool):
+    def _open_device(self, port_path: str) -> VNA:
+        if port_path == "broken":
+            raise RuntimeError("failed to identify VNA device")
+        return VNA(SleepyDriver(float(port_path)))
+
+
+def test_vnapool_scan_many_runs_in_parallel() -> None:
+    pool = SleepyPool(max_scan_workers=8)
+    ports = ["0.1", "0.1", "broken", "0.12", "0.1", "1.0"]
+    try:
+        batch = pool.scan_many(ports, timeout=0.5)
+    finally:
+        pool.close_all()
+
+    assert [result.port for result in batch.results] == ports
+    assert batch.elapsed < 0.9
+    assert batch["0.12"].data.s11[0] == pytest.approx(0.12)
+    assert [result.port for result in batch.failures] == ["broken", "1.0"]
+    assert isinstance(batch["1.0"].error, TimeoutError)
+    assert not batch.ok
+
+
+def test_vnapool_scan_many_timeout_is_per_device() -> None:
+    pool = SleepyPool(max_scan_workers=1)
+    try:
+        # Queued behind the first scan, the second is not charged for waiting.
+        assert pool.scan_many(["0.2", "0.25"], timeout=0.35).ok
+
+        batch = pool.scan_many(["1.0"], timeout=0.1)
+        assert isinstance(batch["1.0"].error, TimeoutError)
+        started = time.perf_counter()
+        again = pool.scan_many(["1.0"], timeout=0.1)
+        assert "still running" in str(again["1.0"].error)
+        assert time.perf_counter() - started < 0.1
+    finally:
+        pool.close_all()
+
+
+class FlakyDriver(StubDriver):
+    def __init__(self) -> None:
+        super().__init__([])
+        self.alive = True
+
+    def identify(self) -> str:
+        if not self.alive:
+            raise RuntimeError("v2: expected 1 bytes, received 0")
+        return "stub"
+
+
+def test_vnapool_supervisor_probes_evicts_and_reconnects() -> None:
+    drivers: list[FlakyDriver] = []
+
+    class SupervisedPool(VNAPool):
+        reachable = True
+
+        def _open_device(self, port_path: str) -> VNA:
+            if not self.reachable:
+                raise RuntimeError("failed to identify VNA device")
+            drivers.append(FlakyDriver())
+            return VNA(drivers[-1])
+
+    pool = SupervisedPool(idle_ttl=60.0, probe_interval=1.0, retry_backoff=2.0)
+    first = pool.get("a")
+    now = time.monotonic()
+
+    drivers[-1].alive = False
+    pool.reachable = False
+    pool.supervise_once(now + 1.5)
+    states = pool.device_states()
+    assert states["a"].state is DeviceState.FAILED
+    assert states["a"].failures == 1
+    with pytest.raises(DeviceUnavailableError):
+        pool.get("a")
+
+    # Reconnect attempts back off exponentially while the device stays down.
+    pool.supervise_once(now + 5.0)
+    assert pool.device_states()["a"].failures == 2
+
+    pool.reachable = True
+    pool.supervise_once(now + 30.0)
+    assert pool.device_states()["a"].state is DeviceState.HEALTHY
+    second = pool.get("a")
+    assert second is not first
+
+    pool.supervise_once(time.monotonic() + 120.0)
+    assert "a" not in pool.device_states()
+    pool.close_all()
+
+
+class GatedDriver(StubDriver):
+    def __init__(self) -> None:
+        super().__init__([])
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.scans = 0
+        self.sweeps: list[SweepConfig] = []
+
+    def set_sweep(self, config: SweepConfig) -> None:
+        self.sweeps.append(config)
+
+    def scan(self) -> VNAData:
+        self.scans += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return VNAData(frequencies=[1e6], s11=[complex(self.scans, 0)], s21=[0j])
+
+
+def test_vna_coalesces_identical_concurrent_scans() -> None:
+    driver = GatedDriver()
+    vna = VNA(driver)
+    sweep = SweepConfig(start=1e6, stop=2e6, points=1)
+    results: list[VNAData] = []
+
+    def request() -> None:
+        results.append(vna.get_data(SweepConfig(start=1e6, stop=2e6, points=1)))
+
+    first = threading.Thread(target=request)
+    first.start()
+    assert driver.started.wait(5)
+    followers = [threading.Thread(target=request) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    driver.release.set()
+    for thread in [first, *followers]:
+        thread.join(5)
+
+    assert driver.scans == 1
+    assert len(results) == 5
+    assert all(result is results[0] for result in results)
+
+    # A different sweep is a different acquisition.
+    vna.get_data(SweepConfig(start=1e6, stop=3e6, points=1))
+    assert driver.scans == 2
+    assert driver.sweeps[0] == sweep
+
+
+def test_vna_get_data_max_age_serves_cached_sweep() -> None:
+    sequence = [VNAData(frequencies=[1e6], s11=[complex(idx, 0)], s21=[0j]) for idx in range(4)]
+    driver = StubDriver(sequence)
+    vna = VNA(driver)
+    sweep = SweepConfig(start=1e6, stop=2e6, points=1)
+
+    first = vna.get_data(sweep, max_age=10.0)
+    assert vna.get_data(sweep, max_age=10.0) is first
+    assert vna.get_data(max_age=10.0) is first
+    assert vna.cache_stats().hits == 2
+    assert vna.cache_stats().misses == 1
+
+    # max_age=0 effectively demands a new sweep; so does a different config.
+    time.sleep(0.01)
+    assert vna.get_data(sweep, max_age=0.0).s11[0] == 1
+    assert vna.get_data(SweepConfig(start=1e6, stop=3e6, points=1), max_age=10.0).s11[0] == 2
+    assert vna.get_data(sweep, max_age=10.0).s11[0] == 3
+    stats = vna.cache_stats()
+    assert (stats.hits, stats.misses) == (2, 4)
+    assert stats.hit_ratio == pytest.approx(2 / 6)
+
+
+def test_vna_get_data_caches_under_the_sweep_actually_scanned(monkeypatch: pytest.MonkeyPatch) -> None:
+    sequence = [VNAData(frequencies=[1e6], s11=[complex(idx, 0)], s21=[0j]) for idx in range(3)]
+    vna = VNA(StubDriver(sequence))
+    first = SweepConfig(start=1e6, stop=2e6, points=1)
+    second = SweepConfig(start=1e6, stop=3e6, points=1)
+    vna.set_sweep(first)
+
+    # Another thread reprograms the device after get_data computed its key.
+    acquire = vna._acquire
+
+    def racing_acquire(sweep):
+        vna.set_sweep(second)
+        return acquire(sweep)
+
+    monkeypatch.setattr(vna, "_acquire", racing_acquire)
+    assert vna.get_data(max_age=10.0).s11[0] == 0
+    monkeypatch.setattr(vna, "_acquire", acquire)
+
+    assert vna.get_data(first, max_age=10.0).s11[0] == 1
+    assert vna.get_data(second, max_age=10.0).s11[0] == 2
+
+
+class ContinuousDriver:
+    def __init__(self) -> None:
+        self.config = SweepConfig(start=1e6, stop=2e6, points=3)
+        self.scans = 0
+
+    def identify(self) -> str:  # pragma: no cover - not used in tests
+        return "continuous"
+
+    def set_sweep(self, config: SweepConfig) -> None:
+        self.config = config
+
+    def scan(self) -> VNAData:
+        time.sleep(0.002)
+        self.scans += 1
+        points = self.config.points
+        return VNAData(
+            frequencies=np.linspace(self.config.start, self.config.stop, points),
+            s11=np.full(points, complex(self.scans, 0)),
+            s21=np.zeros(points, dtype=complex),
+        )
+
+    def close(self) -> None:
+        pass
+
+
+def test_vna_background_acquisition_serves_latest_sweep() -> None:
+    driver = ContinuousDriver()
+    vna = VNA(driver)
+    vna.set_sweep(driver.config)
+    vna.start_acquisition()
+
+    first = vna.get_data()
+    assert len(first) == 3
+    seen = first.s11[0]
+    time.sleep(0.02)
+    second = vna.get_data()
+    assert second.s11[0].real > seen.real
+    # Published sweeps are never reused, so earlier readers keep their data.
+    assert first.s11[0] == seen
+
+    # After a sweep change only sweeps on the new grid are served.
+    data = vna.get_data(SweepConfig(start=5e6, stop=6e6, points=5))
+    assert len(data) == 5
+    assert data.frequencies[0] == 5e6
+
+    vna.close()
+    assert vna._acquisition is None
+    scans = driver.scans
+    time.sleep(0.02)
+    assert driver.scans == scans
+
+
+class UnpluggedDriver(ContinuousDriver):
+    def __init__(self) -> None:
+        super().__init__()
+        self.unplugged = threading.Event()
+
+    def scan(self) -> VNAData:
+        if self.unplugged.is_set():
+            raise RuntimeError("v1: no response to scan command")
+        return super().scan()
+
+
+def test_vna_background_acquisition_stops_serving_after_failure() -> None:
+    driver = UnpluggedDriver()
+    vna = VNA(driver)
+    vna.set_sweep(driver.config)
+    vna.start_acquisition()
+    assert len(vna.get_data()) == 3
+
+    driver.unplugged.set()
+    deadline = time.monotonic() + 5
+    while vna._acquisition is not None and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert vna._acquisition is None
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match="no response"):
+            vna.get_data()
+    vna.close()
+
+
+def test_device_executors_bound_backlog_per_device(monkeypatch: pytest.MonkeyPatch) -> None:
+    executors = main.DeviceExecutors(max_pending=2)
+    monkeypatch.setattr(main, "device_executors", executors)
+    release = threading.Event()
+    busy = [executors.submit("/dev/slow", release.wait, 5) for _ in range(2)]
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.scan(port="/dev/slow", accept=None))
+    assert excinfo.value.status_code == 503
+
+    # Other devices are unaffected by the full backlog.
+    assert executors.submit("/dev/fast", lambda: "ok").result(5) == "ok"
+
+    release.set()
+    for future in busy:
+        future.result(5)
+    executors.shutdown()
+
+
+def test_device_executors_submit_survives_concurrent_discard(monkeypatch: pytest.MonkeyPatch) -> None:
+    executors = main.DeviceExecutors()
+
+    class DiscardedExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            # A failing scan on another thread drops the executor mid-submit.
+            racer = threading.Thread(target=executors.discard, args=("/dev/flaky",))
+            racer.start()
+            racer.join(0.2)
+            return super().submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(main, "ThreadPoolExecutor", DiscardedExecutor)
+    assert executors.submit("/dev/flaky", lambda: "ok").result(5) == "ok"
+    assert executors.pending("/dev/flaky") == 0
+    executors.shutdown()
+
+
+def test_binary_sweep_encodings_round_trip() -> None:
+    data = VNAData(
+        frequencies=[1e6, 2e6, 3e6],
+        s11=[complex(0.1, -0.2), complex(0.3, 0.4), complex(-0.5, 0.6)],
+        s21=[complex(1, 0), complex(0, 1), complex(-1, 0)],
+    )
+    assert formats.decode_raw(formats.encode_raw(data)) == data
+    single = formats.decode_raw(formats.encode_raw(data, np.float32))
+    assert single.s11 == pytest.approx(data.s11, rel=1e-6)
+    assert len(formats.encode_raw(data, np.float32)) == formats.RAW_HEADER.size + 3 * 4 * 5
+
+    table = np.load(io.BytesIO(formats.encode_npy(data)))
+    assert np.array_equal(table["s21"], data.s21)
+
+    assert formats.negotiate(None) == formats.MEDIA_TOUCHSTONE
+    assert formats.negotiate("*/*") == formats.MEDIA_TOUCHSTONE
+    assert formats.negotiate("text/html") is None
+    accept = "text/plain;q=0.5, application/x-npy, application/vnd.pyvna.f32;q=0.9"
+    assert formats.negotiate(accept) == formats.MEDIA_NPY
+    assert formats.negotiate("application/vnd.apache.arrow.stream", [formats.MEDIA_NPY]) is None
+
+
+def test_arrow_encoding_round_trips() -> None:
+    pa = pytest.importorskip("pyarrow")
+    data = VNAData(
+        frequencies=[1e6, 2e6, 3e6],
+        s11=[complex(0.1, -0.2), complex(0.3, 0.4), complex(-0.5, 0.6)],
+        s21=[complex(1, 0), complex(0, 1), complex(-1, 0)],
+    )
+    table = pa.ipc.open_stream(formats.encode_arrow(data)).read_all()
+    assert table.column_names == ["frequency", "s11_re", "s11_im", "s21_re", "s21_im"]
+    columns = {name: table.column(name).to_numpy() for name in table.column_names}
+    assert np.array_equal(columns["frequency"], data.frequencies)
+    assert np.array_equal(columns["s11_re"] + 1j * columns["s11_im"], data.s11)
+    assert np.array_equal(columns["s21_re"] + 1j * columns["s21_im"], data.s21)
+    assert formats.MEDIA_ARROW in formats.available_media_types()
+
+
+def test_streaming_writers_emit_bounded_chunks() -> None:
+    points = 2500
+    data = VNAData(
+        frequencies=np.linspace(1e6, 2e6, points),
+        s11=np.full(points, complex(0.25, -0.5)),
+        s21=np.zeros(points, dtype=complex),
+    )
+    chunks = list(data.iter_touchstone(chunk_points=1000))
+    assert len(chunks) == 4  # header plus three bodies
+    assert chunks[0].endswith("# Hz S RI R 50\n")
+    assert "".join(chunks[1:]) == data.to_touchstone().split("# Hz S RI R 50\n", 1)[1]
+    assert chunks[1].count("\n") == 1000
+
+    lines = "".join(formats.iter_ndjson(data, chunk_points=1000)).splitlines()
+    assert len(lines) == points
+    assert json.loads(lines[0]) == {"frequency": 1e6, "s11": [0.25, -0.5], "s21": [0.0, 0.0]}
+
+
+def test_live_sweeps_share_one_loop_and_drop_stale_frames() -> None:
+    scans: list[tuple[str, SweepConfig]] = []
+
+    def acquire(port: str, sweep: SweepConfig) -> VNAData:
+        time.sleep(0.005)
+        scans.append((port, sweep))
+        return VNAData(frequencies=[sweep.start], s11=[complex(len(scans), 0)], s21=[0j])
+
+    executors = main.DeviceExecutors()
+    live = main.LiveSweeps(executors, acquire)
+    sweep = SweepConfig(start=1e6, stop=2e6, points=1)
+
+    async def run() -> None:
+        async with live.subscribe("/dev/a", sweep) as fast, live.subscribe("/dev/a", sweep) as slow:
+            assert live.feeds() == 1
+            first = await fast.next()
+            assert first is await slow.next()
+            await asyncio.sleep(0.05)  # slow subscriber falls behind
+            for _ in range(3):
+                await fast.next()
+            latest = await slow.next()
+            assert latest.s11[0].real >= first.s11[0].real + 3
+            assert slow.dropped > 0
+        assert live.feeds() == 0
+
+    asyncio.run(run())
+    assert {port for port, _ in scans} == {"/dev/a"}
+    executors.shutdown()
+
+
+def test_live_subscriber_delivers_pending_sweep_before_failing() -> None:
+    data = VNAData(frequencies=[1e6], s11=[0j], s21=[0j])
+
+    async def run() -> None:
+        subscriber = main.LiveSubscriber()
+        subscriber.offer(data)
+        subscriber.fail(RuntimeError("device unplugged"))
+        assert await subscriber.next() is data
+        with pytest.raises(RuntimeError, match="unplugged"):
+            await asyncio.wait_for(subscriber.next(), 1.0)
+
+    asyncio.run(run())
+
+
+def test_vna_skips_reprogramming_an_unchanged_sweep() -> None:
+    class RecordingDriver(StubDriver):
+        def __init__(self) -> None:
+            super().__init__([VNAData(frequencies=[1e6], s11=[0j], s21=[0j])] * 4)
+            self.programmed: list[SweepConfig] = []
+
+        def set_sweep(self, config: SweepConfig) -> None:
+            self.programmed.append(config)
+
+    driver = RecordingDriver()
+    vna = VNA(driver)
+    sweep = main.resolve_sweep(start=1e6, stop=2e6, points=1)
+    vna.get_data(sweep)
+    vna.get_data(SweepConfig(start=1e6, stop=2e6, points=1))
+    vna.set_sweep(sweep)
+    assert len(driver.programmed) == 1
+    vna.get_data(main.resolve_sweep("hf"))
+    assert driver.programmed[-1] == main.SWEEP_PRESETS["hf"]
+    assert len(driver.programmed) == 2
+
+    assert main.resolve_sweep("uhf", points=11).points == 11
+    with pytest.raises(HTTPException):
+        main.resolve_sweep("nope")
+    with pytest.raises(HTTPException):
+        main.resolve_sweep(start=5e6, stop=1e6)
+
+
+class DeadDevicePool(VNAPool):
+    def _open_device(self, port_path: str) -> VNA:
+        return VNA(StubDriver([]))
+
+
+def test_server_reports_scan_failures_to_the_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    dead = DeadDevicePool(retry_backoff=60.0)
+    monkeypatch.setattr(main, "pool", dead)
+    sweep = SweepConfig(start=1e6, stop=2e6, points=1)
+    with pytest.raises(HTTPException) as excinfo:
+        main._scan_device("/dev/dead", sweep, None)
+    assert excinfo.value.status_code == 500
+    assert dead.device_states()["/dev/dead"].state is DeviceState.FAILED
+
+    # The wedged device is not touched again until its backoff elapses.
+    with pytest.raises(HTTPException) as excinfo:
+        main._scan_device("/dev/dead", sweep, None)
+    assert excinfo.value.status_code == 503
+    dead.close_all()
+
+
+class GarbledDriver(StubDriver):
+    def scan(self) -> VNAData:
+        raise ValueError("v1: failed to parse float on line 3")
+
+
+def _degenerate_profile(freq: np.ndarray) -> CalibrationProfile:
+    profile = _profile_for(
+        freq,
+        CalibrationErrorTerms(
+            directivity=np.zeros(len(freq), dtype=complex),
+            source_match=np.zeros(len(freq), dtype=complex),
+            reflection_tracking=np.zeros(len(freq), dtype=complex),
+        ),
+    )
+    placeholder = CalibrationMeasurement(frequencies=freq, s11=np.zeros(len(freq)), s21=np.zeros(len(freq)))
+    profile.standards = {
+        standard: placeholder
+        for standard in (CalibrationStandard.OPEN, CalibrationStandard.SHORT, CalibrationStandard.LOAD)
+    }
+    return profile
+
+
+def test_calibration_errors_do_not_fail_a_healthy_device(monkeypatch: pytest.MonkeyPatch) -> None:
+    freq = np.linspace(1e6, 2e6, 3)
+    sweep = SweepConfig(start=1e6, stop=2e6, points=3)
+    data = VNAData(frequencies=freq, s11=np.ones(3), s21=np.zeros(3))
+    pool = DriverPool(lambda port: StubDriver([data] * 4))
+    pool.get("cal").load_calibration(_degenerate_profile(freq))
+
+    result = pool.scan_many(["cal"], sweep)["cal"]
+    assert isinstance(result.error, ZeroDivisionError)
+    monkeypatch.setattr(main, "pool", pool)
+    with pytest.raises(HTTPException) as excinfo:
+        main._scan_device("cal", sweep, None)
+    assert excinfo.value.status_code == 500
+    assert pool.device_states()["cal"].state is DeviceState.HEALTHY
+    pool.close_all()
+
+
+def test_garbled_replies_fail_the_device() -> None:
+    pool = DriverPool(lambda port: GarbledDriver([]))
+    result = pool.scan_many(["garbled"], SweepConfig(start=1e6, stop=2e6, points=3))["garbled"]
+    assert isinstance(result.error, ValueError)
+    assert pool.device_states()["garbled"].state is DeviceState.FAILED
+    pool.close_all()
+
+
+class DriverPool(VNAPool):
+    """Pool opening a VNA around whatever driver ``factory`` returns for a port."""
+
+    def __init__(self, factory) -> None:
+        super().__init__()
+        self.factory = factory
+
+    def _open_device(self, port_path: str) -> VNA:
+        return VNA(self.factory(port_path))
+
+
+def _serve(monkeypatch: pytest.MonkeyPatch, pool: VNAPool) -> TestClient:
+    executors = main.DeviceExecutors()
+    pool.on_close(executors.discard)
+    monkeypatch.setattr(main, "pool", pool)
+    monkeypatch.setattr(main, "device_executors", executors)
+    monkeypatch.setattr(main, "_inflight_scans", {})
+    monkeypatch.setattr(main, "live_sweeps", main.LiveSweeps(executors, main._acquire_live))
+    return TestClient(main.app)
+
+
+def test_scan_endpoint_coalesces_identical_requests(monkeypatch: pytest.MonkeyPatch) -> None:
+    driver = GatedDriver()
+    params = {"port": "/dev/a", "start": 1e6, "stop": 2e6, "points": 1}
+    responses: list = []
+    with _serve(monkeypatch, DriverPool(lambda port: driver)) as client:
+        threads = [
+            threading.Thread(target=lambda: responses.append(client.get("/api/v1/scan", params=params)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        assert driver.started.wait(5)
+        time.sleep(0.1)
+        driver.release.set()
+        for thread in threads:
+            thread.join(5)
+        assert main.device_executors.pending("/dev/a") == 0
+
+    assert driver.scans == 1
+    assert [response.status_code for response in responses] == [200] * 5
+    assert len({response.text.split("# Hz S RI R 50\n")[1] for response in responses}) == 1
+
+
+def test_scan_endpoint_drops_executors_of_unknown_ports(monkeypatch: pytest.MonkeyPatch) -> None:
+    def missing(port: str) -> StubDriver:
+        raise RuntimeError("failed to identify VNA device")
+
+    with _serve(monkeypatch, DriverPool(missing)) as client:
+        for idx in range(50):
+            assert client.get("/api/v1/scan", params={"port": f"/dev/made-up-{idx}"}).status_code == 500
+        assert len(main.device_executors) == 0
+
+    capped = main.DeviceExecutors(max_devices=1)
+    release = threading.Event()
+    capped.submit("/dev/a", release.wait, 5)
+    with pytest.raises(main.DeviceBusyError):
+        capped.submit("/dev/b", lambda: None)
+    release.set()
+    capped.shutdown()
+
+
+def test_scan_endpoint_negotiates_binary_encodings(monkeypatch: pytest.MonkeyPatch) -> None:
+    params = {"port": "/dev/a", "start": 1e6, "stop": 2e6, "points": 5}
+    with _serve(monkeypatch, DriverPool(lambda port: ContinuousDriver())) as client:
+        response = client.get("/api/v1/scan", params=params, headers={"Accept": formats.MEDIA_RAW_F32})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == formats.MEDIA_RAW_F32
+        data = formats.decode_raw(response.content)
+        assert data.frequencies.tolist() == pytest.approx(np.linspace(1e6, 2e6, 5).tolist())
+
+        response = client.get("/api/v1/scan", params=params, headers={"Accept": "application/x-npy, */*;q=0.1"})
+        assert response.headers["content-type"] == formats.MEDIA_NPY
+        assert len(np.load(io.BytesIO(response.content))) == 5
+
+        assert client.get("/api/v1/scan", params=params, headers={"Accept": "image/png"}).status_code == 406
+
+
+def test_scan_endpoint_streams_text_encodings(monkeypatch: pytest.MonkeyPatch) -> None:
+    params = {"port": "/dev/a", "start": 1e6, "stop": 2e6, "points": 2100}
+    with _serve(monkeypatch, DriverPool(lambda port: ContinuousDriver())) as client:
+        response = client.get("/api/v1/scan", params=params)
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text.split("# Hz S RI R 50\n", 1)[1]
+        assert body.count("\n") == 2100
+        assert body.startswith("1000000.000000 ")
+
+        response = client.get("/api/v1/scan", params=params, headers={"Accept": formats.MEDIA_NDJSON})
+        assert response.headers["content-type"] == formats.MEDIA_NDJSON
+        lines = response.text.splitlines()
+        assert len(lines) == 2100
+        assert json.loads(lines[-1])["frequency"] == 2e6
+
+
+class BlockingDriver(ContinuousDriver):
+    def __init__(self) -> None:
+        super().__init__()
+        self.block = threading.Event()
+        self.blocked = threading.Event()
+        self.release = threading.Event()
+
+    def scan(self) -> VNAData:
+        if self.block.is_set():
+            self.blocked.set()
+            assert self.release.wait(5)
+        return super().scan()
+
+
+def test_vna_acquisition_readers_restating_the_sweep_do_not_lock() -> None:
+    driver = BlockingDriver()
+    vna = VNA(driver)
+    sweep = SweepConfig(start=1e6, stop=2e6, points=3)
+    vna.set_sweep(sweep)
+    vna.start_acquisition()
+    assert len(vna.get_data(sweep)) == 3
+
+    driver.block.set()
+    assert driver.blocked.wait(5)  # the loop now holds the device lock
+    started = time.perf_counter()
+    assert len(vna.get_data(SweepConfig(start=1e6, stop=2e6, points=3))) == 3
+    assert time.perf_counter() - started < 0.5
+    driver.release.set()
+    vna.close()
+
+
+def test_scan_api_parameters_presets_and_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    with _serve(monkeypatch, DriverPool(lambda port: ContinuousDriver())) as client:
+        presets = client.get("/api/v1/presets").json()
+        assert presets["hf"] == {"start": 1e6, "stop": 30e6, "points": 291}
+
+        response = client.post(
+            "/api/v1/scan",
+            json={"port": "/dev/a", "preset": "hf", "points": 4},
+            headers={"Accept": formats.MEDIA_RAW_F64},
+        )
+        assert response.status_code == 200
+        data = formats.decode_raw(response.content)
+        assert data.frequencies.tolist() == [1e6, 10.666666666666666e6, 20.333333333333332e6, 30e6]
+
+        for params in (
+            {"port": "/dev/a", "start": 5e6, "stop": 1e6},
+            {"port": "/dev/a", "preset": "nope"},
+            {"port": "/dev/a", "points": main.MAX_SWEEP_POINTS + 1},
+            {"port": "/dev/a", "points": 1_000_000_000},
+        ):
+            assert client.get("/api/v1/scan", params=params).status_code == 400
+        assert client.post("/api/v1/scan", json={"port": "/dev/a", "points": 0}).status_code == 400
+
+
+class OneShotDriver(ContinuousDriver):
+    """Delivers one sweep and then stops answering."""
+
+    def scan(self) -> VNAData:
+        if self.scans:
+            raise RuntimeError("v1: no response to scan command")
+        return super().scan()
+
+
+def test_live_websocket_streams_raw_frames_then_closes_on_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+    with _serve(monkeypatch, DriverPool(lambda port: OneShotDriver())) as client:
+        with client.websocket_connect("/api/v1/live?port=/dev/a&start=1e6&stop=2e6&points=3") as websocket:
+            frame = formats.decode_raw(websocket.receive_bytes())
+            assert frame.frequencies.tolist() == [1e6, 1.5e6, 2e6]
+            with pytest.raises(WebSocketDisconnect) as excinfo:
+                websocket.receive_bytes()
+        assert excinfo.value.code == 1011
+        assert "no response" in excinfo.value.reason
+
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            with client.websocket_connect("/api/v1/live?port=/dev/a&points=0"):
+                pass
+        assert excinfo.value.code == 1008
+
+
+def test_live_events_stream_sweeps_then_the_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    params = {"port": "/dev/a", "start": 1e6, "stop": 2e6, "points": 3}
+    with _serve(monkeypatch, DriverPool(lambda port: OneShotDriver())) as client:
+        with client.stream("GET", "/api/v1/live/sse", params=params) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = [event for event in response.read().decode().split("\n\n") if event]
+        assert len(events) == 2
+        name, payload = events[0].split("\n")
+        assert name == "event: sweep"
+        sweep = json.loads(payload.removeprefix("data: "))
+        assert sweep["frequency"] == [1e6, 1.5e6, 2e6]
+        assert sweep["s11_re"] == [1.0, 1.0, 1.0]
+        assert events[1].startswith("event: error\ndata: ")
+        assert "no response" in events[1]
+
+        assert client.get("/api/v1/live/sse", params={"port": "/dev/a", "points": 0}).status_code == 400